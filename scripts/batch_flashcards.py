@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Build many flashcard decks in one process from a batch manifest.
+
+The manifest is a JSON file with a list of decks and optional defaults shared by
+all of them. Each key is a compose_flashcards_from_png.py option without the
+leading dashes; `true` turns a flag on and lists pass several values:
+
+    {
+      "defaults": {"images": "data/illustrations", "font": "fonts/Andika-Regular.ttf"},
+      "decks": [
+        {"name": "en", "mapping": "mapping.json", "out": "build/en"},
+        {"name": "en-blue", "mapping": "mapping.json", "out": "build/en-blue",
+         "letter_color": "#0088FF", "preset": ["3x5", "thumb"]}
+      ]
+    }
+
+Relative paths are resolved against the manifest's directory. Every deck gets the
+same crop cache and process pool (sized by --jobs; decks cannot set "jobs"), and
+illustration directories are indexed once.
+Fonts, text layouts and recently cropped illustrations stay cached in the workers
+from one deck to the next. A combined report is printed at the end.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+from compose_flashcards_from_png import (
+    BuildResources,
+    EncodeStats,
+    build_deck,
+    parse_args as parse_deck_args,
+)
+
+# Deck options that name files or directories.
+PATH_OPTIONS = {
+    "mapping",
+    "images",
+    "out",
+    "font",
+    "cache_dir",
+    "stats_json",
+    "trace",
+    "cprofile",
+    "package",
+}
+
+# Deck options that only batch_flashcards.py itself takes (all decks share one pool).
+BATCH_OPTIONS = {"jobs": "--jobs"}
+
+# ----------------------------------
+# Helpers
+# ----------------------------------
+
+
+def deck_argv(options: Dict[str, Any], base_dir: Path) -> List[str]:
+    """Turn one deck's manifest options into compose_flashcards_from_png arguments."""
+    argv: List[str] = []
+    for key, value in options.items():
+        if key == "name" or value is None or value is False:
+            continue
+        flag = f"--{key}"
+        if value is True:
+            argv.append(flag)
+            continue
+        values = value if isinstance(value, list) else [value]
+        if key in PATH_OPTIONS:
+            values = [str(base_dir / v) for v in values]
+        argv += [flag, *(str(v) for v in values)]
+    return argv
+
+
+def load_decks(
+    manifest_path: Path, cache_dir: Path
+) -> List[tuple[str, argparse.Namespace]]:
+    """Parse and validate every deck of the manifest before anything is built."""
+    data = json.loads(manifest_path.read_text(encoding="utf-8"))
+    defaults = data.get("defaults", {})
+    base_dir = manifest_path.parent
+    decks = []
+    for i, deck in enumerate(data.get("decks", []), start=1):
+        options = {"cache_dir": str(cache_dir.resolve()), **defaults, **deck}
+        name = str(options.get("name") or f"deck {i}")
+        for key, flag in BATCH_OPTIONS.items():
+            if key in options:
+                raise SystemExit(
+                    f"{manifest_path}: {key!r} cannot be set per deck ({name}); "
+                    f"pass {flag} to batch_flashcards.py instead"
+                )
+        try:
+            args = parse_deck_args(deck_argv(options, base_dir))
+        except SystemExit:
+            raise SystemExit(f"{manifest_path}: invalid options for {name}") from None
+        decks.append((name, args))
+    return decks
+
+
+# ----------------------------------
+# CLI
+# ----------------------------------
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build several flashcard decks from a batch manifest."
+    )
+    parser.add_argument("manifest", type=Path, help="Batch manifest (JSON).")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes shared by all decks (default: CPU count).",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=Path,
+        default=Path("data/.cache"),
+        help="Crop cache shared by all decks unless a deck sets its own.",
+    )
+    parser.add_argument(
+        "--report", type=Path, default=None, help="Write the combined report as JSON."
+    )
+    return parser.parse_args()
+
+
+# ----------------------------------
+# Main
+# ----------------------------------
+
+
+def main() -> int:
+    args = parse_args()
+    decks = load_decks(args.manifest, args.cache_dir)
+
+    summaries = []
+    with BuildResources(jobs=max(1, args.jobs)) as shared:
+        for name, deck_args in decks:
+            print(f"\n=== {name} → {deck_args.out} ===")
+            summary = build_deck(deck_args, shared)
+            summary["name"] = name
+            summaries.append(summary)
+
+    total = EncodeStats()
+    print("\nBatch report:")
+    print(
+        f"  {'deck':<20} {'cards':>6} {'built':>6} {'current':>8} {'missing':>8} "
+        f"{'written MB':>11} {'time s':>8}"
+    )
+    for summary in summaries:
+        stats = summary["stats"]
+        total.merge(stats)
+        written = sum(entry[1] for entry in stats.formats.values())
+        print(
+            f"  {summary['name']:<20} {summary['cards']:>6} {summary['rendered']:>6} "
+            f"{summary['up_to_date']:>8} {len(summary['missing']):>8} "
+            f"{written / 1e6:>11.2f} {summary['seconds']:>8.1f}"
+        )
+    if total.formats:
+        print("Encoded output (all decks):")
+        for line in total.summary_lines():
+            print(" ", line)
+
+    if args.report is not None:
+        report = [
+            {key: value for key, value in summary.items() if key != "stats"}
+            for summary in summaries
+        ]
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Report written to {args.report}")
+
+    missing = sum(len(summary["missing"]) for summary in summaries)
+    if missing:
+        print(f"\n{missing} flashcard(s) skipped due to missing illustrations.")
+        return 1
+    print(f"\n✅ Built {len(summaries)} deck(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Benchmark the flashcard composition pipeline stage by stage.
+
+Stages timed:
+- mapping: load_mapping
+- lookup: building the illustration index and finding every word
+- font_prepass: deck-wide letters/word font pre-pass (cold font cache)
+- decode, autocrop, fit, compose, png_encode, svg_build: per illustration and size
+- autocrop_pillow: the Pillow-only autocrop, for comparison when NumPy is installed
+
+Runs over the bundled illustrations (unreadable files such as Git LFS pointers are
+skipped) plus synthetic larger images, at several card sizes, and writes JSON
+results that can be compared against a saved baseline with --baseline (only if
+both runs used the same font and illustrations).
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import PIL
+from PIL import Image, ImageDraw
+
+import compose_flashcards_from_png
+from compose_flashcards_from_png import (
+    IllustrationIndex,
+    Layout,
+    autocrop_image,
+    clear_font_cache,
+    compose_svg,
+    deck_font_sizes,
+    encode_image,
+    fit_image,
+    image_area_size,
+    load_font_exact,
+    load_mapping,
+    parse_size,
+    pil_to_base64_png,
+    render_canvas,
+    resolve_font_path,
+    rgb_to_hex,
+)
+
+# Slowdowns smaller than this (in seconds per run) are treated as timer noise.
+NOISE_FLOOR_S = 0.001
+
+# Run settings that must match the baseline's for stage timings to be comparable.
+COMPARABLE_META = ("font", "limit", "synthetic", "sources")
+
+# ----------------------------------
+# Helpers
+# ----------------------------------
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "runs": len(samples),
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "total": sum(samples),
+    }
+
+
+def synthetic_illustration(side: int) -> bytes:
+    """
+    A PNG-encoded RGBA test image with a white margin and a few flat shapes, so
+    autocrop and resampling do representative work at larger-than-bundled sizes.
+    """
+    img = Image.new("RGBA", (side, side), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(img)
+    m = side // 8
+    draw.ellipse((m, m, side - m, side - m), fill=(220, 40, 40, 255))
+    draw.rectangle((side // 3, side // 3, side // 2, side - 2 * m), fill=(40, 120, 40))
+    draw.polygon(
+        [(side // 2, m), (side - m, side // 2), (side // 2, side // 2)],
+        fill=(40, 40, 200, 200),
+    )
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+# ----------------------------------
+# Benchmark
+# ----------------------------------
+
+
+def bench_size(
+    sources: List[Tuple[str, str, bytes]],
+    pairs: List[Tuple[str, str]],
+    layout: Layout,
+    ttf_path: Optional[Path],
+    repeat: int,
+) -> Dict[str, Dict[str, float]]:
+    """Time every per-card stage for all sources at one layout."""
+    samples: Dict[str, List[float]] = {}
+
+    def lap(stage: str, start: float) -> float:
+        now = time.perf_counter()
+        samples.setdefault(stage, []).append(now - start)
+        return now
+
+    max_w, max_h = image_area_size(layout)
+    for _ in range(repeat):
+        clear_font_cache()
+        t = time.perf_counter()
+        letters_px, word_px = deck_font_sizes(pairs, layout, ttf_path, cached=None)
+        lap("font_prepass", t)
+        letters_font = load_font_exact(ttf_path, letters_px)
+        word_font = load_font_exact(ttf_path, word_px)
+
+        for _name, word, data in sources:
+            letters_text = f"{word[0].upper()} {word[0].lower()}"
+
+            t = time.perf_counter()
+            with Image.open(io.BytesIO(data)) as img:
+                src = img.convert("RGBA")
+            t = lap("decode", t)
+
+            if compose_flashcards_from_png.np is not None:
+                autocrop_image(src, vectorized=False)
+                t = lap("autocrop_pillow", t)
+
+            cropped = autocrop_image(src)
+            t = lap("autocrop", t)
+
+            fitted = fit_image(cropped, max_w, max_h)
+            t = lap("fit", t)
+
+            canvas, (img_x, img_y, letters_y, word_y) = render_canvas(
+                letters_text=letters_text,
+                word_text=word,
+                fitted=fitted,
+                layout=layout,
+                letters_font=letters_font,
+                word_font=word_font,
+                letters_color_rgb=(255, 0, 0),
+                word_color_rgb=(0, 0, 0),
+            )
+            t = lap("compose", t)
+
+            encode_image(canvas, "PNG")
+            t = lap("png_encode", t)
+
+            compose_svg(
+                canvas_w=layout.width,
+                canvas_h=layout.height,
+                letters_text=letters_text,
+                letters_fill=rgb_to_hex((255, 0, 0)),
+                word_text=word,
+                word_fill=rgb_to_hex((0, 0, 0)),
+                word_font_family="Andika",
+                letters_font_family="Andika",
+                img_b64_png=pil_to_base64_png(fitted),
+                img_x=img_x,
+                img_y=img_y,
+                img_w=fitted.width,
+                img_h=fitted.height,
+                letters_x=layout.letters_x,
+                letters_y=letters_y,
+                word_center_x=int(layout.width / 2),
+                word_y=word_y,
+                letters_font_px=letters_px,
+                word_font_px=word_px,
+            )
+            lap("svg_build", t)
+
+    return {stage: summarize(values) for stage, values in samples.items()}
+
+
+def meta_mismatches(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Return one line per run setting that differs from the baseline's. Settings a
+    (older) baseline did not record are not compared.
+    """
+    base_meta = baseline.get("meta", {})
+    mismatches = []
+    for key in COMPARABLE_META:
+        if key not in base_meta:
+            continue
+        value = results["meta"].get(key)
+        base = base_meta[key]
+        if value != base:
+            mismatches.append(f"{key}: {value!r} (baseline {base!r})")
+    return mismatches
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Return one line per stage whose median regressed by more than threshold."""
+    regressions = []
+    for size, stages in results["results"].items():
+        base_stages = baseline.get("results", {}).get(size, {})
+        for stage, summary in stages.items():
+            base = base_stages.get(stage)
+            if not base or base["median"] <= 0:
+                continue
+            ratio = summary["median"] / base["median"]
+            marker = ""
+            if (
+                ratio > 1 + threshold
+                and summary["median"] - base["median"] > NOISE_FLOOR_S
+            ):
+                marker = "  <-- regression"
+                regressions.append(f"{size} {stage}: {ratio:.2f}x baseline")
+            print(
+                f"  {size:<10} {stage:<13} {summary['median'] * 1e3:>9.2f} ms "
+                f"(baseline {base['median'] * 1e3:>9.2f} ms, {ratio:>5.2f}x){marker}"
+            )
+    return regressions
+
+
+# ----------------------------------
+# CLI
+# ----------------------------------
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the flashcard composition pipeline."
+    )
+    parser.add_argument("--mapping", type=Path, default=Path("mapping.json"))
+    parser.add_argument("--images", type=Path, default=Path("data/illustrations"))
+    parser.add_argument(
+        "--font", type=Path, default=None, help="Optional path to a TrueType font file."
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=parse_size,
+        default=[(600, 1000), (1500, 2500), (3000, 5000)],
+        metavar="WxH",
+        help="Card sizes to benchmark (default: 600x1000 1500x2500 3000x5000).",
+    )
+    parser.add_argument(
+        "--synthetic",
+        nargs="*",
+        type=int,
+        default=[2048, 4096],
+        metavar="SIDE",
+        help="Also time square synthetic illustrations of these sizes.",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="Only use the first N bundled illustrations.",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per size.")
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Write JSON results to this file."
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=None, help="Compare against saved results."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Relative slowdown that counts as a regression (default: 0.10).",
+    )
+    return parser.parse_args()
+
+
+# ----------------------------------
+# Main
+# ----------------------------------
+
+
+def main() -> int:
+    args = parse_args()
+    ttf_path = resolve_font_path(args.font)
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "font": str(ttf_path) if ttf_path else None,
+            "repeat": args.repeat,
+            "limit": args.limit,
+            "synthetic": args.synthetic,
+        },
+        "results": {},
+    }
+
+    # Stages that do not depend on the card size.
+    mapping_samples, lookup_samples = [], []
+    for _ in range(args.repeat):
+        t = time.perf_counter()
+        pairs = load_mapping(args.mapping)
+        mapping_samples.append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        index = IllustrationIndex(args.images)
+        found = [(word, index.find(word)) for _, word in pairs]
+        lookup_samples.append(time.perf_counter() - t)
+    results["results"]["global"] = {
+        "mapping": summarize(mapping_samples),
+        "lookup": summarize(lookup_samples),
+    }
+
+    sources: List[Tuple[str, str, bytes]] = []
+    skipped = []
+    for word, path in found[: args.limit]:
+        if path is None:
+            continue
+        data = path.read_bytes()
+        try:
+            Image.open(io.BytesIO(data)).verify()
+        except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+            skipped.append(path.name)
+            continue
+        sources.append((path.name, word, data))
+    for side in args.synthetic:
+        sources.append((f"synthetic-{side}", "Synthetic", synthetic_illustration(side)))
+    results["meta"]["sources"] = [name for name, _, _ in sources]
+    if skipped:
+        print(f"Skipping unreadable illustrations: {', '.join(skipped)}")
+
+    for w, h in args.sizes:
+        print(f">>> {w}x{h} ({len(sources)} illustrations x {args.repeat})")
+        stages = bench_size(sources, pairs, Layout(w, h), ttf_path, args.repeat)
+        results["results"][f"{w}x{h}"] = stages
+        for stage, summary in stages.items():
+            print(
+                f"  {stage:<13} median {summary['median'] * 1e3:>9.2f} ms"
+                f"  total {summary['total']:>7.2f} s"
+            )
+
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"Results written to {args.output}")
+
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        mismatches = meta_mismatches(results, baseline)
+        if mismatches:
+            print(f"\nNot comparable with {args.baseline}; the runs differ in:")
+            for line in mismatches:
+                print(" -", line)
+            return 2
+        print(f"\nComparison with {args.baseline} (median per run):")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(" -", line)
+            return 1
+        print("\n✅ No regressions above threshold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,202 @@
 #!/usr/bin/env python3
+"""
+Check a built deck against mapping.json.
+
+Besides comparing file names, every file is validated without decoding its pixels:
+- card PNGs: signature, IHDR (with CRC) and a final IEND chunk, so truncated and
+  empty files are caught; dimensions match the SVG of the same card (and --size);
+- card SVGs: the XML parses, and every <image> references a valid PNG, either
+  embedded as base64 or as an existing file, of the size it is drawn at;
+- source illustrations: readable (Pillow's verify, no decode) and at least
+  --min_source_px on their shorter side.
+
+Files are checked in parallel (--jobs). --report writes the results as JSON, and
+the exit status is 1 if anything is missing, unexpected or invalid.
+"""
 
 import argparse
+import base64
+import binascii
 import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from compose_flashcards_from_png import IllustrationIndex, parse_size
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_IEND = b"\x00\x00\x00\x00IEND\xaeB`\x82"
+SVG_NS = "{http://www.w3.org/2000/svg}"
+XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+DATA_PNG_PREFIX = "data:image/png;base64,"
+
+# ----------------------------------
+# Validation
+# ----------------------------------
+
+
+def png_size(head: bytes, tail: bytes) -> Tuple[int, int]:
+    """
+    (width, height) of a PNG from its first 33 and last 12 bytes. Raises ValueError
+    if the signature or IHDR is broken, or the file does not end with IEND.
+    """
+    if len(head) < 33 or head[:8] != PNG_SIGNATURE:
+        raise ValueError("not a PNG file")
+    if head[8:16] != b"\x00\x00\x00\x0dIHDR":
+        raise ValueError("PNG has no IHDR chunk")
+    if zlib.crc32(head[12:29]) != int.from_bytes(head[29:33], "big"):
+        raise ValueError("PNG header is corrupt (IHDR CRC mismatch)")
+    width = int.from_bytes(head[16:20], "big")
+    height = int.from_bytes(head[20:24], "big")
+    if not width or not height:
+        raise ValueError("PNG has zero width or height")
+    if tail != PNG_IEND:
+        raise ValueError("PNG is truncated (no IEND chunk at the end)")
+    return (width, height)
+
+
+def png_file_size(path: Path) -> Tuple[int, int]:
+    with path.open("rb") as f:
+        head = f.read(33)
+        if len(head) < 33:
+            raise ValueError(f"PNG is truncated ({len(head)} bytes)")
+        f.seek(-len(PNG_IEND), os.SEEK_END)
+        return png_size(head, f.read())
+
+
+def check_png(path: Path) -> Dict[str, Any]:
+    return {"size": list(png_file_size(path))}
+
+
+def check_svg(path: Path) -> Dict[str, Any]:
+    try:
+        # Parsing from bytes is several times faster than ET.parse(path) for the
+        # long base64 attributes of inline SVGs.
+        root = ET.fromstring(path.read_bytes())
+    except ET.ParseError as e:
+        raise ValueError(f"SVG does not parse: {e}") from None
+    if root.tag != f"{SVG_NS}svg":
+        raise ValueError("not an SVG document")
+    try:
+        size = [int(float(root.get(attr, ""))) for attr in ("width", "height")]
+    except ValueError:
+        raise ValueError("SVG has no numeric width and height") from None
+
+    images = list(root.iter(f"{SVG_NS}image"))
+    if not images:
+        raise ValueError("SVG has no <image>")
+    for image in images:
+        href = image.get("href") or image.get(XLINK_HREF)
+        if not href:
+            raise ValueError("<image> has no href")
+        if href.startswith(DATA_PNG_PREFIX):
+            # Like card PNGs, only the header and the end are checked: decode the
+            # first and last base64 groups (the payload is a multiple of 4 long).
+            b64 = href[len(DATA_PNG_PREFIX) :]
+            try:
+                if len(b64) % 4:
+                    raise binascii.Error
+                head = base64.b64decode(b64[:44], validate=True)
+                tail = base64.b64decode(b64[-24:], validate=True)
+            except binascii.Error:
+                raise ValueError("embedded image is not valid base64") from None
+            try:
+                image_size = png_size(head, tail[-len(PNG_IEND) :])
+            except ValueError as e:
+                raise ValueError(f"embedded image: {e}") from None
+        elif href.startswith("data:"):
+            raise ValueError("embedded image is not a base64 PNG")
+        else:
+            target = path.parent / href
+            if not target.is_file():
+                raise ValueError(f"referenced image {href} does not exist")
+            try:
+                image_size = png_file_size(target)
+            except ValueError as e:
+                raise ValueError(f"{href}: {e}") from None
+        drawn = (image.get("width"), image.get("height"))
+        if drawn != (str(image_size[0]), str(image_size[1])):
+            raise ValueError(
+                f"image is {image_size[0]}x{image_size[1]} but drawn at "
+                f"{drawn[0]}x{drawn[1]}"
+            )
+    return {"size": size}
+
 
+def check_source(path: Path, min_px: int) -> Dict[str, Any]:
+    try:
+        with Image.open(path) as img:
+            size = img.size
+            img.verify()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise ValueError(
+            f"unreadable illustration ({path.stat().st_size} bytes): {e}"
+        ) from None
+    if min(size) < min_px:
+        raise ValueError(
+            f"illustration is {size[0]}x{size[1]}, smaller than {min_px}px"
+        )
+    return {"size": list(size)}
 
-def main():
+
+def check_file(task: Tuple[str, str, int]) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Validate one (kind, path, min_source_px) task; returns (info, error)."""
+    kind, name, min_px = task
+    path = Path(name)
+    try:
+        if kind == "png":
+            return (check_png(path), "")
+        if kind == "svg":
+            return (check_svg(path), "")
+        return (check_source(path, min_px), "")
+    except (OSError, ValueError) as e:
+        return (None, str(e))
+
+
+# ----------------------------------
+# Main
+# ----------------------------------
+
+
+def main() -> int:
     ap = argparse.ArgumentParser()
     ap.add_argument("--svgs", default="data/svgs")
     ap.add_argument("--pngs", default="data/pngs")
     ap.add_argument("--mapping", default="mapping.json")
+    ap.add_argument("--images", default="data/illustrations")
+    ap.add_argument(
+        "--size",
+        type=parse_size,
+        default=None,
+        metavar="WxH",
+        help="Also require every card to be this size.",
+    )
+    ap.add_argument(
+        "--min_source_px",
+        type=int,
+        default=256,
+        help="Smallest allowed side of a source illustration (default: 256).",
+    )
+    ap.add_argument(
+        "--names_only",
+        action="store_true",
+        help="Only compare file names; do not validate file contents.",
+    )
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes used to validate files (default: CPU count).",
+    )
+    ap.add_argument(
+        "--report", type=Path, default=None, help="Write the results as JSON."
+    )
     args = ap.parse_args()
 
     mapping = json.loads(Path(args.mapping).read_text(encoding="utf-8"))
@@ -29,6 +216,52 @@ def main():
     extra_svgs = svgs - exp
     extra_pngs = pngs - exp
 
+    images_dir = Path(args.images)
+    missing_illustrations = set()
+    ambiguous_illustrations = []
+    sources = set()
+    if images_dir.is_dir():
+        index = IllustrationIndex(images_dir)
+        missing_illustrations = {
+            f"{k} ({v})" for k, v in mapping.items() if index.find(v) is None
+        }
+        ambiguous_illustrations = index.ambiguity_reports(mapping.values())
+        sources = {index.find(v) for v in mapping.values()} - {None}
+
+    # Validate every file present, in parallel.
+    tasks: List[Tuple[str, str, int]] = []
+    if not args.names_only:
+        tasks += [("png", str(Path(args.pngs) / f"{x}.png"), 0) for x in sorted(pngs)]
+        tasks += [("svg", str(Path(args.svgs) / f"{x}.svg"), 0) for x in sorted(svgs)]
+        tasks += [("source", str(path), args.min_source_px) for path in sorted(sources)]
+    jobs = max(1, min(args.jobs, len(tasks) // 8 + 1))
+    if jobs == 1:
+        results = [check_file(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunksize = max(1, len(tasks) // (jobs * 8))
+            results = list(executor.map(check_file, tasks, chunksize=chunksize))
+
+    invalid: Dict[str, str] = {}
+    sizes: Dict[Tuple[str, str], Tuple[int, ...]] = {}
+    for (kind, name, _), (info, error) in zip(tasks, results, strict=True):
+        if error:
+            invalid[name] = error
+        elif kind != "source":
+            sizes[(kind, Path(name).stem)] = tuple(info["size"])
+    for (kind, stem), size in sorted(sizes.items()):
+        path = Path(args.pngs if kind == "png" else args.svgs) / f"{stem}.{kind}"
+        if args.size is not None and size != args.size:
+            invalid[str(path)] = (
+                f"card is {size[0]}x{size[1]}, expected {args.size[0]}x{args.size[1]}"
+            )
+        elif kind == "png" and sizes.get(("svg", stem), size) != size:
+            svg_size = sizes[("svg", stem)]
+            invalid[str(path)] = (
+                f"card is {size[0]}x{size[1]} but its SVG is "
+                f"{svg_size[0]}x{svg_size[1]}"
+            )
+
     print(f"Expected total: {len(exp)}")
     print(f"SVGs present: {len(svgs)}, PNGs present: {len(pngs)}")
 
@@ -52,9 +285,60 @@ def main():
         for x in sorted(extra_pngs):
             print(" -", x)
 
-    if not (missing_svgs or missing_pngs or extra_svgs or extra_pngs):
-        print("\n✅ All filenames match mapping.json")
+    if missing_illustrations:
+        print("\nMissing illustrations:")
+        for x in sorted(missing_illustrations):
+            print(" -", x)
+
+    if ambiguous_illustrations:
+        print("\nAmbiguous illustrations:")
+        for x in ambiguous_illustrations:
+            print(" -", x)
+
+    if invalid:
+        print("\nInvalid files:")
+        for name, error in sorted(invalid.items()):
+            print(f" - {name}: {error}")
+
+    ok = not (
+        missing_svgs
+        or missing_pngs
+        or extra_svgs
+        or extra_pngs
+        or missing_illustrations
+        or invalid
+    )
+
+    if args.report is not None:
+        report = {
+            "ok": ok,
+            "expected": len(exp),
+            "svgs": len(svgs),
+            "pngs": len(pngs),
+            "validated": len(tasks),
+            "missing_svgs": sorted(missing_svgs),
+            "missing_pngs": sorted(missing_pngs),
+            "extra_svgs": sorted(extra_svgs),
+            "extra_pngs": sorted(extra_pngs),
+            "missing_illustrations": sorted(missing_illustrations),
+            "ambiguous_illustrations": ambiguous_illustrations,
+            "invalid": [
+                {"file": name, "error": error}
+                for name, error in sorted(invalid.items())
+            ],
+        }
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nReport written to {args.report}")
+
+    if ok:
+        if args.names_only:
+            print("\n✅ All filenames match mapping.json")
+        else:
+            print(f"\n✅ All filenames match mapping.json; {len(tasks)} files valid")
+        return 0
+    return 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -13,12 +13,70 @@ from __future__ import annotations
 
 import argparse
 import base64
+import contextlib
+import cProfile
+import functools
+import hashlib
 import io
 import json
+import mmap
+import os
+import queue
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import weakref
+import zipfile
+import zlib
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Tuple
-
-from PIL import Image, ImageDraw, ImageFont, ImageChops, ImageOps
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from xml.sax.saxutils import escape, quoteattr
+
+from PIL import Image, ImageDraw, ImageFont, ImageChops, ImageOps, features
+
+if TYPE_CHECKING:
+    from typing import Self
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import numpy as np
+except ImportError:  # optional, for a faster autocrop
+    np = None
+
+try:
+    import zstandard
+except ImportError:  # optional, for --package_formats tar.zst
+    zstandard = None
+
+try:
+    from fontTools.pens.svgPathPen import SVGPathPen
+    from fontTools.pens.transformPen import TransformPen
+    from fontTools.ttLib import TTFont
+except ImportError:  # optional, for --svg_text paths
+    TTFont = None
 
 # ----------------------------------
 # Font candidates (used if --font not provided)
@@ -47,26 +105,72 @@ def load_mapping(mapping_path: Path) -> List[Tuple[str, str]]:
     return pairs
 
 
+ILLUSTRATION_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def normalize_name(name: str) -> str:
+    """Lowercase and keep only alphanumerics, so 'Ice cream' matches 'ice_cream.png'."""
+    return "".join(ch for ch in name.lower() if ch.isalnum())
+
+
+class IllustrationIndex:
+    """
+    Normalized-stem → file index of an illustrations directory, built with one scan.
+
+    When several files normalize to the same stem (e.g. 'Cat.png' and 'cat.webp'),
+    the one whose extension comes first in `exts` wins, then the lowest file name;
+    the others are kept in `ambiguous` so callers can report them.
+    """
+
+    def __init__(
+        self, images_dir: Path, exts: Iterable[str] = ILLUSTRATION_EXTS
+    ) -> None:
+        self.images_dir = images_dir
+        priority = {ext: i for i, ext in enumerate(exts)}
+        candidates: Dict[str, List[Tuple[int, str, Path]]] = {}
+        with os.scandir(images_dir) as entries:
+            for entry in entries:
+                stem, ext = os.path.splitext(entry.name)
+                rank = priority.get(ext.lower())
+                if rank is None or not entry.is_file():
+                    continue
+                candidates.setdefault(normalize_name(stem), []).append(
+                    (rank, entry.name, Path(entry.path))
+                )
+
+        self.paths: Dict[str, Path] = {}
+        self.ambiguous: Dict[str, List[Path]] = {}
+        for key, found in candidates.items():
+            found.sort()
+            self.paths[key] = found[0][2]
+            if len(found) > 1:
+                self.ambiguous[key] = [path for _, _, path in found]
+
+    def find(self, word: str) -> Optional[Path]:
+        """Return the illustration for a word, or None."""
+        return self.paths.get(normalize_name(word))
+
+    def ambiguity_reports(self, words: Iterable[str]) -> List[str]:
+        """Describe ambiguous matches for the given words, in a stable order."""
+        reports = []
+        for word in sorted(set(words)):
+            found = self.ambiguous.get(normalize_name(word))
+            if found:
+                names = ", ".join(p.name for p in found)
+                reports.append(f"'{word}' matches {names}; using {found[0].name}")
+        return reports
+
+
 def find_illustration(
     images_dir: Path,
     word: str,
-    exts: Iterable[str] = (".png", ".jpg", ".jpeg", ".webp"),
+    exts: Iterable[str] = ILLUSTRATION_EXTS,
 ) -> Optional[Path]:
-    """Find an illustration file for the given word (case-insensitive, common extensions)."""
-
-    def normalize(name: str) -> str:
-        return "".join(ch for ch in name.lower() if ch.isalnum())
-
-    want = normalize(word)
-
-    for p in images_dir.iterdir():
-        if not p.is_file():
-            continue
-        if p.suffix.lower() not in exts:
-            continue
-        if normalize(p.stem) == want:
-            return p
-    return None
+    """
+    Find an illustration file for the given word (case-insensitive, common extensions).
+    Scans the directory on every call; build an IllustrationIndex to look up many words.
+    """
+    return IllustrationIndex(images_dir, exts).find(word)
 
 
 def ensure_out_dirs(out_dir: Path) -> Tuple[Path, Path]:
@@ -89,23 +193,103 @@ def resolve_font_path(preferred: Optional[Path]) -> Optional[Path]:
     return None
 
 
+@functools.lru_cache(maxsize=512)
+def _load_truetype(font_path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(font_path, size=size)
+
+
+def clear_font_cache() -> None:
+    """Drop every cached font and text layout (used to time cold font pre-passes)."""
+    _load_truetype.cache_clear()
+    _text_bbox.cache_clear()
+    _text_mask.cache_clear()
+    _glyph_font.cache_clear()
+    glyph_outline.cache_clear()
+
+
+def get_font(font_path: Path, size: int) -> ImageFont.FreeTypeFont:
+    """
+    Return a TrueType font at an exact size from a process-wide LRU cache.
+    The TTF is parsed once per (font path, size) no matter how often it is requested.
+    """
+    return _load_truetype(str(font_path), size)
+
+
 def load_font_exact(
     font_path: Optional[Path], size: int
 ) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
     """Load a TrueType font at an exact size; fall back to PIL default if unavailable."""
     if font_path is not None and font_path.exists():
         try:
-            return ImageFont.truetype(str(font_path), size=size)
+            return get_font(font_path, size)
         except OSError:
             return ImageFont.load_default()
     return ImageFont.load_default()
 
 
-def measure_text(
-    draw: ImageDraw.ImageDraw, text: str, font: ImageFont.ImageFont
-) -> Tuple[int, int]:
+# Text layout cache. Fonts from get_font are shared per (path, size), so their
+# measurements and rasterized masks can be shared per (path, size, text) as well:
+# the pre-pass, every card and every output size then measure each string once.
+# Worker processes are forked after the pre-pass and inherit its entries.
+
+
+def _cache_key(font: ImageFont.ImageFont) -> Optional[Tuple[str, int]]:
+    path = getattr(font, "path", None)
+    if isinstance(font, ImageFont.FreeTypeFont) and isinstance(path, str):
+        return (path, font.size)
+    return None
+
+
+@functools.lru_cache(maxsize=16384)
+def _text_bbox(font_path: str, size: int, text: str) -> Tuple[int, int, int, int]:
+    return _load_truetype(font_path, size).getbbox(text)
+
+
+@functools.lru_cache(maxsize=256)
+def _text_mask(font_path: str, size: int, text: str) -> Image.Image:
+    bbox = _text_bbox(font_path, size, text)
+    mask = Image.new("L", (bbox[2] - bbox[0], bbox[3] - bbox[1]), 0)
+    font = _load_truetype(font_path, size)
+    ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), text, font=font, fill=255)
+    return mask
+
+
+def text_bbox(text: str, font: ImageFont.ImageFont) -> Tuple[int, int, int, int]:
+    """
+    Bounding box of text drawn at (0, 0), as ImageDraw.textbbox returns it.
+    Cached per (font file, size, text) for fonts from get_font.
+    """
+    key = _cache_key(font)
+    if key is None:
+        return font.getbbox(text)
+    return _text_bbox(key[0], key[1], text)
+
+
+def draw_text(
+    canvas: Image.Image,
+    xy: Tuple[int, int],
+    text: str,
+    font: ImageFont.ImageFont,
+    fill: Tuple[int, int, int],
+) -> None:
+    """
+    Draw text like ImageDraw.text, pasting a cached rasterized mask when the font
+    comes from get_font (same pixels, rasterized once per font, size and text).
+    """
+    key = _cache_key(font)
+    if key is None:
+        ImageDraw.Draw(canvas).text(xy, text, font=font, fill=fill)
+        return
+    bbox = _text_bbox(key[0], key[1], text)
+    if bbox[2] <= bbox[0] or bbox[3] <= bbox[1]:
+        return
+    mask = _text_mask(key[0], key[1], text)
+    canvas.paste(fill, (xy[0] + bbox[0], xy[1] + bbox[1]), mask)
+
+
+def measure_text(text: str, font: ImageFont.ImageFont) -> Tuple[int, int]:
     """Return (width, height) of rendered text with the given font."""
-    bbox = draw.textbbox((0, 0), text, font=font)
+    bbox = text_bbox(text, font)
     return (bbox[2] - bbox[0], bbox[3] - bbox[1])
 
 
@@ -121,30 +305,69 @@ def autofit_font(
     """
     Find the largest TrueType font size that fits within (max_w, max_h).
     Returns (font, size). If no TTF is available, returns PIL default and a heuristic size.
-    """
-    dummy = Image.new("RGB", (max(1, max_w), max(1, max_h)))
-    draw = ImageDraw.Draw(dummy)
 
+    Candidate sizes are start_size, start_size + step, ... up to ceiling. Rather than
+    walking them one by one, the search brackets the answer around a proportional
+    estimate and bisects, which yields the same size as a linear walk because rendered
+    text only grows with the font size.
+    """
     if font_path is None or not font_path.exists():
         default_font = ImageFont.load_default()
         nominal = max(24, min(max_w, max_h) // 2)
         return (default_font, nominal)
 
     size = max(8, start_size)
-    last_good_size = size
-    last_good_font: ImageFont.ImageFont = ImageFont.truetype(str(font_path), size=size)
-
-    while size <= ceiling:
-        test_font = ImageFont.truetype(str(font_path), size=size)
-        w, h = measure_text(draw, text, test_font)
-        if w <= max_w and h <= max_h:
-            last_good_font = test_font
-            last_good_size = size
-            size += step
-            continue
-        break
+    last_index = (ceiling - size) // step
 
-    return (last_good_font, last_good_size)
+    def fits(index: int) -> bool:
+        w, h = measure_text(text, get_font(font_path, size + index * step))
+        return w <= max_w and h <= max_h
+
+    if last_index <= 0 or not fits(0):
+        return (get_font(font_path, size), size)
+
+    # Invariant: candidate `good` fits, candidate `bad` does not (or is past the ceiling).
+    good, bad = 0, last_index + 1
+
+    # Text extent scales roughly linearly with size, so start probing near the estimate.
+    w0, h0 = measure_text(text, get_font(font_path, size))
+    if w0 > 0 and h0 > 0:
+        scale = min(max_w / w0, max_h / h0)
+        guess = min(last_index, max(1, int((size * scale - size) / step)))
+    else:
+        guess = last_index
+
+    # Gallop away from the estimate until the answer is bracketed.
+    gap = 1
+    if fits(guess):
+        good = guess
+        while good < last_index:
+            probe = min(last_index, good + gap)
+            if not fits(probe):
+                bad = probe
+                break
+            good = probe
+            gap *= 2
+    else:
+        bad = guess
+        while bad - good > 1:
+            probe = max(good, bad - gap)
+            if probe == good or fits(probe):
+                good = probe
+                break
+            bad = probe
+            gap *= 2
+
+    # Bisect the remaining bracket.
+    while bad - good > 1:
+        mid = (good + bad) // 2
+        if fits(mid):
+            good = mid
+        else:
+            bad = mid
+
+    best = size + good * step
+    return (get_font(font_path, best), best)
 
 
 def compute_min_letters_font_px(
@@ -198,32 +421,198 @@ def compute_min_word_font_px(
     return min_px or max(24, int(min(box_w, box_h) * 0.25))
 
 
-def fit_image(img: Image.Image, max_w: int, max_h: int) -> Image.Image:
-    """Return a resized copy of img that fits within (max_w, max_h) preserving aspect."""
-    w, h = img.size
+def fitted_size(size: Tuple[int, int], max_w: int, max_h: int) -> Tuple[int, int]:
+    """Size of an image of `size` scaled to fit within (max_w, max_h)."""
+    w, h = size
     scale = min(max_w / w, max_h / h)
-    new_size = (max(1, int(w * scale)), max(1, int(h * scale)))
+    return (max(1, int(w * scale)), max(1, int(h * scale)))
+
+
+def fit_image(
+    img: Image.Image, max_w: int, max_h: int, draft: bool = False
+) -> Image.Image:
+    """
+    Return a resized copy of img that fits within (max_w, max_h) preserving aspect.
+    With draft=True, use a cheap bilinear filter and let Pillow reduce() large
+    downscales by an integer factor first (preview quality, same size).
+    """
+    new_size = fitted_size(img.size, max_w, max_h)
+    if draft:
+        return img.resize(new_size, Image.BILINEAR, reducing_gap=2.0)
     return img.resize(new_size, Image.LANCZOS)
 
 
-def autocrop_image(
-    img: Image.Image,
-    bg_rgb: tuple[int, int, int] = (255, 255, 255),
-    tolerance: int = 10,
-    pad_ratio: float = 0.02,
+def _alpha_mask(img: Image.Image) -> Image.Image:
+    alpha = img.split()[3]
+    return alpha.point(lambda a: 255 if a > 0 else 0)
+
+
+# Autocrop tolerance: a single value compares the grayscale (luma) difference from
+# the background; an (R, G, B) triple compares each channel's difference separately.
+Tolerance = Union[int, Tuple[int, int, int]]
+
+
+def _background_mask(
+    img: Image.Image, bg_rgb: Tuple[int, int, int], tolerance: Tolerance
 ) -> Image.Image:
+    # Work on an RGB copy for background-diff
+    rgb = img.convert("RGB")
+    bg = Image.new("RGB", rgb.size, bg_rgb)
+    # Difference from the background
+    diff = ImageChops.difference(rgb, bg)
+    if not isinstance(tolerance, int):
+        # Per channel: nonzero wherever any channel is beyond its tolerance.
+        return diff.point([255 if v > t else 0 for t in tolerance for v in range(256)])
+    # Convert to grayscale and threshold with tolerance
+    gray = diff.convert("L")
+    return gray.point(lambda p: 255 if p > tolerance else 0)
+
+
+MaskFn = Callable[[Image.Image], Image.Image]
+
+
+def strip_bbox(
+    img: Image.Image, mask_fn: MaskFn, strip_rows: int
+) -> Optional[Tuple[int, int, int, int]]:
     """
-    Trim outer borders that are either fully transparent OR close to a uniform background color.
-    - Works for RGBA (alpha) and RGB images.
-    - 'tolerance' lets us ignore slight antialiasing around edges.
-    - Adds a small uniform padding after crop so art doesn't touch the edge.
+    Bounding box of the nonzero pixels of mask_fn(img), computed strip by strip so
+    mask_fn only ever sees strip_rows rows at a time.
+    """
+    bbox = None
+    for top in range(0, img.height, strip_rows):
+        strip = img.crop((0, top, img.width, min(img.height, top + strip_rows)))
+        found = mask_fn(strip).getbbox()
+        if found is None:
+            continue
+        found = (found[0], found[1] + top, found[2], found[3] + top)
+        if bbox is None:
+            bbox = found
+        else:
+            bbox = (
+                min(bbox[0], found[0]),
+                bbox[1],
+                max(bbox[2], found[2]),
+                found[3],
+            )
+    return bbox
+
+
+# Rows or columns the NumPy autocrop examines at a time while scanning inwards.
+CROP_SCAN_STEP = 32
+
+BoxMaskFn = Callable[[Tuple[int, int, int, int]], Any]
+
+
+def _edge_scan_bbox(
+    box: Tuple[int, int, int, int], mask_fn: BoxMaskFn
+) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Bounding box (like Image.getbbox, but in image coordinates) of the True values
+    of the mask within box, found by scanning inwards from each edge in
+    CROP_SCAN_STEP blocks. mask_fn returns the 2-D boolean mask of a sub-box.
+    Only the margins up to the content are examined, not the whole image.
     """
+    x0, y0, x1, y1 = box
+    step = CROP_SCAN_STEP
+    top = bottom = left = right = None
+    for y in range(y0, y1, step):
+        rows = np.flatnonzero(mask_fn((x0, y, x1, min(y1, y + step))).any(axis=1))
+        if rows.size:
+            top = y + int(rows[0])
+            break
+    if top is None:
+        return None
+    for y in range(y1, top, -step):
+        start = max(top, y - step)
+        rows = np.flatnonzero(mask_fn((x0, start, x1, y)).any(axis=1))
+        if rows.size:
+            bottom = start + int(rows[-1]) + 1
+            break
+    for x in range(x0, x1, step):
+        cols = np.flatnonzero(mask_fn((x, top, min(x1, x + step), bottom)).any(axis=0))
+        if cols.size:
+            left = x + int(cols[0])
+            break
+    for x in range(x1, left, -step):
+        start = max(left, x - step)
+        cols = np.flatnonzero(mask_fn((start, top, x, bottom)).any(axis=0))
+        if cols.size:
+            right = start + int(cols[-1]) + 1
+            break
+    return (left, top, right, bottom)
+
+
+def _crop_box_numpy(
+    img: Image.Image, bg_rgb: Tuple[int, int, int], tolerance: Tolerance
+) -> Tuple[int, int, int, int]:
+    """
+    The box autocrop_image crops to (before padding), computed with NumPy on the
+    image margins instead of a chain of full-size Pillow images. Same result as
+    the Pillow path: the alpha box first, then the background box within it.
+    """
+    bg = np.array(tuple(bg_rgb) + (0,) * (len(img.getbands()) - 3), np.uint8)
+
+    def channel_diffs(box: Tuple[int, int, int, int]) -> List[Any]:
+        # |pixel - background| per channel, without leaving uint8. Whole rows are
+        # compared against a repeated background row, which is much faster than
+        # broadcasting over the short bands axis.
+        block = np.asarray(img.crop(box))
+        h, w, bands = block.shape
+        rows = block.reshape(h, w * bands)
+        bg_row = np.tile(bg, w)
+        diff = np.maximum(rows, bg_row) - np.minimum(rows, bg_row)
+        return [diff.reshape(block.shape)[:, :, c] for c in range(3)]
+
+    if isinstance(tolerance, int):
+
+        def differs(box: Tuple[int, int, int, int]) -> Any:
+            d = channel_diffs(box)
+            # Luma lies between the smallest and largest channel difference, so
+            # pixels within tolerance on every channel are ruled out cheaply.
+            mask = np.maximum(np.maximum(d[0], d[1]), d[2]) > tolerance
+            if not mask.any():
+                return mask
+            # Pillow's RGB -> L conversion (ITU-R 601-2 luma, 16-bit fixed point).
+            luma = d[0] * np.int32(19595) + d[1] * np.int32(38470)
+            luma += d[2] * np.int32(7471) + 0x8000
+            return (luma >> 16) > tolerance
+
+    else:
+
+        def differs(box: Tuple[int, int, int, int]) -> Any:
+            d = channel_diffs(box)
+            return (d[0] > tolerance[0]) | (d[1] > tolerance[1]) | (d[2] > tolerance[2])
+
+    box = (0, 0, img.width, img.height)
+    if img.mode == "RGBA":
+        alpha = img.getchannel("A")
+        alpha_box = _edge_scan_bbox(box, lambda b: np.asarray(alpha.crop(b)) > 0)
+        if alpha_box is not None:
+            box = alpha_box
+    return _edge_scan_bbox(box, differs) or box
+
+
+def _trim_pillow(
+    img: Image.Image,
+    bg_rgb: Tuple[int, int, int],
+    tolerance: Tolerance,
+    memory_limit: Optional[int],
+) -> Image.Image:
+    """Steps 1) and 2) of autocrop_image with Pillow masks."""
+    # Roughly 12 bytes of temporaries per pixel (RGB copy, background, diff, masks).
+    strip_rows = img.height
+    if memory_limit is not None:
+        strip_rows = max(1, min(img.height, memory_limit // (12 * img.width)))
+
+    def bbox_of(image: Image.Image, mask_fn: MaskFn) -> Optional[Tuple[int, ...]]:
+        if strip_rows >= image.height:
+            return mask_fn(image).getbbox()
+        return strip_bbox(image, mask_fn, strip_rows)
+
     mode = img.mode
     # 1) If RGBA, try alpha-based crop first
     if mode == "RGBA":
-        alpha = img.split()[3]
-        mask = alpha.point(lambda a: 255 if a > 0 else 0)
-        bbox = mask.getbbox()
+        bbox = bbox_of(img, _alpha_mask)
         if bbox:
             img = img.crop(bbox)
 
@@ -231,18 +620,38 @@ def autocrop_image(
     if img.mode not in ("RGB", "RGBA"):
         img = img.convert("RGBA")
 
-    # Work on an RGB copy for background-diff
-    rgb = img.convert("RGB")
-    bg = Image.new("RGB", rgb.size, bg_rgb)
-    # Difference from the background
-    diff = ImageChops.difference(rgb, bg)
-    # Convert to grayscale and threshold with tolerance
-    gray = diff.convert("L")
-    thresh = gray.point(lambda p: 255 if p > tolerance else 0)
-    bbox2 = thresh.getbbox()
+    bbox2 = bbox_of(img, lambda part: _background_mask(part, bg_rgb, tolerance))
 
     if bbox2:
         img = img.crop(bbox2)
+    return img
+
+
+def autocrop_image(
+    img: Image.Image,
+    bg_rgb: tuple[int, int, int] = (255, 255, 255),
+    tolerance: Tolerance = 10,
+    pad_ratio: float = 0.02,
+    memory_limit: Optional[int] = None,
+    vectorized: bool = True,
+) -> Image.Image:
+    """
+    Trim outer borders that are either fully transparent OR close to a uniform background color.
+    - Works for RGBA (alpha) and RGB images.
+    - 'tolerance' lets us ignore slight antialiasing around edges; an (R, G, B)
+      triple sets a separate tolerance per channel.
+    - Adds a small uniform padding after crop so art doesn't touch the edge.
+    - With memory_limit (bytes), the masks are built strip by strip instead of as
+      full-size temporary images; the result is the same.
+    - If NumPy is installed (and vectorized is left on), the crop box is found with
+      NumPy in one pass instead; the result is the same.
+    """
+    vectorized = vectorized and np is not None and memory_limit is None
+    if vectorized and img.mode in ("RGB", "RGBA"):
+        # 1) and 2) in one vectorized pass
+        img = img.crop(_crop_box_numpy(img, bg_rgb, tolerance))
+    else:
+        img = _trim_pillow(img, bg_rgb, tolerance, memory_limit)
 
     # 3) Add a small uniform padding
     pad = max(1, int(min(img.size) * pad_ratio))
@@ -251,10 +660,284 @@ def autocrop_image(
     return ImageOps.expand(img, border=pad, fill=bg_rgb)
 
 
-def pil_to_base64_png(img: Image.Image) -> str:
-    """Encode a PIL image to base64 PNG string."""
+# Recently used cropped illustrations, per process, so a worker that gets the same
+# illustration again (e.g. for another deck of a batch) skips even the cached decode.
+# Callers must treat returned images as read-only.
+RECENT_CROPS_PIXELS = 16_000_000
+_recent_crops: "OrderedDict[str, Image.Image]" = OrderedDict()
+
+
+def _remember_crop(key: str, img: Image.Image, keep: bool) -> Image.Image:
+    if not keep:
+        return img
+    _recent_crops[key] = img
+    total = sum(im.width * im.height for im in _recent_crops.values())
+    while total > RECENT_CROPS_PIXELS and len(_recent_crops) > 1:
+        _key, old = _recent_crops.popitem(last=False)
+        total -= old.width * old.height
+    return img
+
+
+def crop_cache_path(
+    crop_cache_dir: Path,
+    source_digest: str,
+    bg_rgb: Tuple[int, int, int] = (255, 255, 255),
+    tolerance: Tolerance = 10,
+    pad_ratio: float = 0.02,
+) -> Tuple[str, Path]:
+    """Return (key, path) of the crop cache entry for a source and crop settings."""
+    key = digest_json(
+        {
+            "source": source_digest,
+            "bg_rgb": bg_rgb,
+            "tolerance": tolerance,
+            "pad_ratio": pad_ratio,
+        }
+    )
+    return (key, crop_cache_dir / f"{key}.png")
+
+
+def load_illustration(
+    path: Path,
+    crop_cache_dir: Optional[Path] = None,
+    source_digest: Optional[str] = None,
+    bg_rgb: Tuple[int, int, int] = (255, 255, 255),
+    tolerance: Tolerance = 10,
+    pad_ratio: float = 0.02,
+    draft_size: Optional[Tuple[int, int]] = None,
+    profiler: Optional[Profiler] = None,
+    memory_limit: Optional[int] = None,
+    source_data: Optional[bytes] = None,
+    crop_data: Optional[bytes] = None,
+    remember: bool = True,
+) -> Image.Image:
+    """
+    Decode an illustration as RGBA and autocrop it.
+
+    With crop_cache_dir set, the cropped image is stored there as a PNG named after a
+    hash of the source bytes and the crop settings, so later builds (at any canvas size)
+    decode the small cropped image instead of redoing the crop analysis. Recent crops
+    are also kept in memory per process (unless memory_limit is set or remember is
+    False).
+
+    draft_size enables reduced-size decoding (JPEG DCT scaling) of sources much larger
+    than the target canvas; such reduced decodes bypass the crop cache.
+    memory_limit is passed on to autocrop_image.
+    source_data and crop_data are the already read bytes of the source file and of
+    its crop cache entry (see prefetch_illustration), used instead of reading them.
+    """
+    profiler = profiler or NULL_PROFILER
+    if draft_size is not None and path.suffix.lower() in (".jpg", ".jpeg"):
+        crop_cache_dir = None
+    if crop_cache_dir is None:
+        source = io.BytesIO(source_data) if source_data is not None else path
+        with profiler.stage("decode"), Image.open(source) as src_img:
+            if draft_size is not None:
+                src_img.draft("RGB", draft_size)
+            rgba = src_img.convert("RGBA")
+        with profiler.stage("autocrop"):
+            return autocrop_image(
+                rgba,
+                bg_rgb=bg_rgb,
+                tolerance=tolerance,
+                pad_ratio=pad_ratio,
+                memory_limit=memory_limit,
+            )
+
+    data = source_data
+    if source_digest is None:
+        data = data if data is not None else path.read_bytes()
+        source_digest = hashlib.sha256(data).hexdigest()
+    key, cached_path = crop_cache_path(
+        crop_cache_dir, source_digest, bg_rgb, tolerance, pad_ratio
+    )
+
+    keep = remember and memory_limit is None
+    if keep and key in _recent_crops:
+        _recent_crops.move_to_end(key)
+        return _recent_crops[key]
+
+    cached_source = io.BytesIO(crop_data) if crop_data is not None else cached_path
+    try:
+        with profiler.stage("crop_cache_read"), Image.open(cached_source) as cached:
+            cached.load()
+            return _remember_crop(key, cached, keep)
+    except OSError:
+        pass
+
+    source = io.BytesIO(data) if data is not None else path
+    with profiler.stage("decode"), Image.open(source) as src_img:
+        rgba = src_img.convert("RGBA")
+    with profiler.stage("autocrop"):
+        cropped = autocrop_image(
+            rgba,
+            bg_rgb=bg_rgb,
+            tolerance=tolerance,
+            pad_ratio=pad_ratio,
+            memory_limit=memory_limit,
+        )
+
+    # Write under a per-process name and rename, so parallel workers never see a
+    # partially written cache entry.
+    with profiler.stage("crop_cache_write"):
+        crop_cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = crop_cache_dir / f"{key}.{os.getpid()}.tmp"
+        cropped.save(tmp_path, format="PNG", compress_level=1)
+        tmp_path.replace(cached_path)
+    return _remember_crop(key, cropped, keep)
+
+
+# Rows copied per write when a cropped illustration is put into the store.
+STORE_COPY_ROWS = 256
+
+
+@contextlib.contextmanager
+def map_shared_illustration(path: str, size: Tuple[int, int]) -> Iterator[Image.Image]:
+    """
+    Map an illustration stored by SharedIllustrationStore as a read-only RGBA
+    image. No pixels are copied: the image wraps the mapped file, so every process
+    that maps it shares the same pages. The mapping is closed on exit, so the image
+    must not be used afterwards.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    img = Image.frombuffer("RGBA", size, mapped, "raw", "RGBA", 0, 1)
+    try:
+        yield img
+    finally:
+        img.close()
+        mapped.close()
+
+
+class SharedIllustrationStore:
+    """
+    Decoded, autocropped illustrations as raw RGBA files in RAM-backed temporary
+    storage (/dev/shm where available), for worker processes to map with
+    map_shared_illustration instead of each decoding and holding its own copy.
+
+    acquire() loads a card's illustration (through the crop cache, like
+    load_illustration) into the store if it is not there yet, and pins it until
+    release(). Unpinned entries are kept for reuse, least recently used first out,
+    while the store is over max_bytes; pinned entries are never dropped. close()
+    deletes every file; it also runs when the store is garbage collected or the
+    interpreter exits, so an interrupted build does not leave files behind.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        shm = Path("/dev/shm")
+        self.dir = Path(
+            tempfile.mkdtemp(
+                prefix="flashcards-store-", dir=shm if shm.is_dir() else None
+            )
+        )
+        self._entries: "OrderedDict[str, Tuple[Path, Tuple[int, int]]]" = OrderedDict()
+        self._pins: Dict[str, int] = {}
+        self._loading: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(
+            self, shutil.rmtree, str(self.dir), ignore_errors=True
+        )
+
+    @staticmethod
+    def _key(card: Dict[str, Any]) -> str:
+        return digest_json(
+            {
+                "illustration": str(card["illustration"]),
+                "digest": card.get("illustration_digest"),
+                "crop": [
+                    card.get("crop_bg_rgb", (255, 255, 255)),
+                    card.get("crop_tolerance", 10),
+                ],
+                "draft_size": card_draft_size(card["targets"], card.get("draft")),
+            }
+        )
+
+    @property
+    def size(self) -> int:
+        """Bytes currently stored."""
+        return sum(w * h * 4 for _, (w, h) in self._entries.values())
+
+    def acquire(self, card: Dict[str, Any]) -> Tuple[str, Tuple[int, int]]:
+        """
+        Store render_card(**card)'s cropped illustration and pin it; returns the
+        (path, size) to pass to map_shared_illustration.
+        """
+        key = self._key(card)
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self._pins[key] = self._pins.get(key, 0) + 1
+                    path, size = self._entries[key]
+                    return (str(path), size)
+                loading = self._loading.get(key)
+                if loading is None:
+                    self._loading[key] = threading.Event()
+                    break
+            loading.wait()
+
+        try:
+            img = load_illustration(
+                card["illustration"],
+                crop_cache_dir=card.get("crop_cache_dir"),
+                source_digest=card.get("illustration_digest"),
+                bg_rgb=card.get("crop_bg_rgb", (255, 255, 255)),
+                tolerance=card.get("crop_tolerance", 10),
+                draft_size=card_draft_size(card["targets"], card.get("draft")),
+                memory_limit=card.get("memory_limit"),
+                remember=False,
+            )
+            path = self.dir / f"{key}.rgba"
+            with path.open("wb") as f:
+                for top in range(0, img.height, STORE_COPY_ROWS):
+                    bottom = min(top + STORE_COPY_ROWS, img.height)
+                    f.write(img.crop((0, top, img.width, bottom)).tobytes())
+            with self._lock:
+                self._entries[key] = (path, img.size)
+                self._pins[key] = self._pins.get(key, 0) + 1
+                self._evict()
+            return (str(path), img.size)
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    def release(self, path: str) -> None:
+        """Unpin an entry returned by acquire(), once its card is rendered."""
+        key = Path(path).stem
+        with self._lock:
+            self._pins[key] -= 1
+            if not self._pins[key]:
+                del self._pins[key]
+            self._evict()
+
+    def _evict(self) -> None:
+        size = self.size
+        for key in list(self._entries):
+            if size <= self.max_bytes:
+                break
+            if key in self._pins:
+                continue
+            path, (w, h) = self._entries.pop(key)
+            path.unlink(missing_ok=True)
+            size -= w * h * 4
+
+    def close(self) -> None:
+        self._entries.clear()
+        self._pins.clear()
+        self._finalizer()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+def pil_to_base64_png(img: Image.Image, **params: Any) -> str:
+    """Encode a PIL image to base64 PNG string (params are passed to Image.save)."""
     buf = io.BytesIO()
-    img.save(buf, format="PNG")
+    img.save(buf, format="PNG", **params)
     return base64.b64encode(buf.getvalue()).decode("ascii")
 
 
@@ -275,6 +958,12 @@ def hex_to_rgb(hex_str: str) -> Tuple[int, int, int]:
     return (r, g, b)
 
 
+def digest_json(value: Any) -> str:
+    """Return a stable SHA-256 hex digest of a JSON-serializable value."""
+    payload = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
 # ----------------------------------
 # Layout
 # ----------------------------------
@@ -301,10 +990,103 @@ class Layout:
         self.word_box_h = int(0.12 * height)
 
 
+# Named canvas sizes for --preset (width, height in pixels).
+PRESETS: Dict[str, Tuple[int, int]] = {
+    "3x5": (1500, 2500),
+    "4x6": (1200, 1800),
+    "thumb": (300, 500),
+}
+
+
+def parse_tolerance(value: str) -> Tolerance:
+    """Parse an autocrop tolerance: one value (e.g. '10') or R,G,B (e.g. '10,10,40')."""
+    try:
+        parts = [int(part) for part in value.split(",")]
+    except ValueError:
+        parts = []
+    if len(parts) not in (1, 3) or not all(0 <= part <= 255 for part in parts):
+        raise argparse.ArgumentTypeError(
+            f"Invalid tolerance (expected N or R,G,B from 0 to 255): {value}"
+        )
+    return parts[0] if len(parts) == 1 else (parts[0], parts[1], parts[2])
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    """Parse a WIDTHxHEIGHT string such as '1500x2500'."""
+    try:
+        w, h = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"Invalid size (expected WxH): {value}"
+        ) from None
+    if w <= 0 or h <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid size (expected WxH): {value}")
+    return (w, h)
+
+
 # ----------------------------------
 # SVG composition
 # ----------------------------------
 
+SVG_TEXT_MODES = ("text", "paths")
+
+
+def svg_number(value: float) -> str:
+    """value rounded to 1/100 px, without trailing zeros (as in path data)."""
+    text = f"{value:.2f}".rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+
+@functools.lru_cache(maxsize=8)
+def _glyph_font(font_path: str) -> TTFont:
+    return TTFont(font_path, lazy=True)
+
+
+@functools.lru_cache(maxsize=4096)
+def glyph_outline(font_path: str, size: int, char: str) -> str:
+    """
+    SVG path data of char's outline in the font at size px, with the origin at the
+    pen position on the baseline and y pointing down. Converted once per (font,
+    size, char) per process; empty for blank glyphs such as the space.
+    """
+    font = _glyph_font(font_path)
+    glyph_set = font.getGlyphSet()
+    glyph = glyph_set[font.getBestCmap().get(ord(char), ".notdef")]
+    scale = size / font["head"].unitsPerEm
+    pen = SVGPathPen(glyph_set, ntos=svg_number)
+    glyph.draw(TransformPen(pen, (scale, 0, 0, -scale, 0, 0)))
+    return pen.getCommands()
+
+
+def glyph_paths_svg(
+    runs: List[Tuple[str, ImageFont.FreeTypeFont, Tuple[int, int], str]],
+) -> str:
+    """
+    Markup drawing each (text, font, draw xy, fill) run as glyph outlines, for
+    compose_svg's text_svg. xy is the draw_text position, so the outlines land
+    where the raster card draws the text. Every distinct glyph is one <path> in
+    <defs>, placed with <use> at the pen positions Pillow lays the text out at.
+    """
+    defs: Dict[str, str] = {}
+    groups = []
+    for text, font, (x, y), fill in runs:
+        key = _cache_key(font)
+        if key is None:
+            raise ValueError("glyph outlines need a TrueType font")
+        baseline = y + font.getmetrics()[0]
+        uses = []
+        for i, char in enumerate(text):
+            outline = glyph_outline(key[0], key[1], char)
+            if not outline:
+                continue
+            glyph_id = f"glyph-{key[1]}-{ord(char):x}"
+            defs.setdefault(glyph_id, outline)
+            pen_x = svg_number(x + font.getlength(text[:i]))
+            uses.append(f'    <use href="#{glyph_id}" x="{pen_x}" y="{baseline}"/>\n')
+        groups.append(f"  <g fill={quoteattr(fill)}>\n{''.join(uses)}  </g>\n")
+    paths = "".join(f'    <path id="{i}" d="{d}"/>\n' for i, d in defs.items())
+    return f"  <defs>\n{paths}  </defs>\n" + "".join(groups)
+
 
 def compose_svg(
     canvas_w: int,
@@ -326,170 +1108,1930 @@ def compose_svg(
     word_y: int,
     letters_font_px: int,
     word_font_px: int,
+    img_href: Optional[str] = None,
+    text_svg: Optional[str] = None,
 ) -> str:
-    """Return an SVG string embedding the illustration and drawing text."""
+    """
+    Return an SVG string embedding the illustration and drawing text.
+    Pass img_href (e.g. a relative path to a sidecar PNG) to reference the
+    illustration instead of inlining img_b64_png, and text_svg (see
+    glyph_paths_svg) to draw the text as outlines instead of <text> elements.
+    Texts and attribute values are XML-escaped, so any word is safe to pass.
+    """
+    if img_href is None:
+        img_href = f"data:image/png;base64,{img_b64_png}"
+    if text_svg is None:
+        fallbacks = "Andika, DejaVu Sans, Arial, sans-serif"
+        text_svg = f"""  <text x="{letters_x}" y="{letters_y}" fill={quoteattr(letters_fill)}
+        font-family={quoteattr(f"{letters_font_family}, {fallbacks}")}
+        font-size="{letters_font_px}" text-anchor="start" dominant-baseline="hanging">{escape(letters_text)}</text>
+  <text x="{word_center_x}" y="{word_y}" fill={quoteattr(word_fill)}
+        font-family={quoteattr(f"{word_font_family}, {fallbacks}")}
+        font-size="{word_font_px}" text-anchor="middle" dominant-baseline="hanging">{escape(word_text)}</text>
+"""
     return f"""<?xml version="1.0" encoding="UTF-8"?>
 <svg width="{canvas_w}" height="{canvas_h}" viewBox="0 0 {canvas_w} {canvas_h}" xmlns="http://www.w3.org/2000/svg">
   <rect x="0" y="0" width="{canvas_w}" height="{canvas_h}" fill="#FFFFFF"/>
   <image x="{img_x}" y="{img_y}" width="{img_w}" height="{img_h}"
-         href="data:image/png;base64,{img_b64_png}" />
-  <text x="{letters_x}" y="{letters_y}" fill="{letters_fill}"
-        font-family="{letters_font_family}, Andika, DejaVu Sans, Arial, sans-serif"
-        font-size="{letters_font_px}" text-anchor="start" dominant-baseline="hanging">{letters_text}</text>
-  <text x="{word_center_x}" y="{word_y}" fill="{word_fill}"
-        font-family="{word_font_family}, Andika, DejaVu Sans, Arial, sans-serif"
-        font-size="{word_font_px}" text-anchor="middle" dominant-baseline="hanging">{word_text}</text>
-</svg>
+         href={quoteattr(img_href)} />
+{text_svg}</svg>
 """
 
 
-# ----------------------------------
-# Build Logic
-# ----------------------------------
+SVG_MODES = ("inline", "external", "sprite")
+SVG_ASSETS_DIR = "assets"
+SPRITE_NAME = "flashcards-sprite.svg"
 
 
-def build_flashcard_for_pair(
-    letter: str,
-    word: str,
-    illustration_path: Path,
-    out_svg_path: Path,
-    out_png_path: Path,
-    layout: Layout,
-    letters_color_rgb: Tuple[int, int, int],
-    word_color_rgb: Tuple[int, int, int],
-    svg_font_family: str,
-    ttf_path: Optional[Path],
-    letters_font_override: Optional[int],
-    word_font_override: Optional[int],
-) -> None:
-    """Render both SVG and PNG flashcards for (letter, word)."""
-    with Image.open(illustration_path) as src_img:
-        src_img = src_img.convert("RGBA")
-        # Trim transparent or near-white borders so all illustrations scale consistently
-        src_img = autocrop_image(
-            src_img, bg_rgb=(255, 255, 255), tolerance=10, pad_ratio=0.02
+def compose_sprite_svg(cards: List[Tuple[str, str]], href_prefix: str = "") -> str:
+    """
+    Combine card SVGs (as returned by compose_svg) into one SVG of <symbol>s.
+    `cards` is a list of (symbol id, card SVG). Relative hrefs are prefixed with
+    href_prefix so they still resolve from the sprite's location. Glyph outlines
+    (see glyph_paths_svg) move from the cards into one shared <defs>, so each
+    distinct glyph is stored once however many cards use it.
+    """
+    glyphs: Dict[str, str] = {}
+    symbols = []
+    for symbol_id, svg_text in cards:
+        match = re.search(r'viewBox="([^"]*)"[^>]*>\n(.*)</svg>', svg_text, re.DOTALL)
+        if match is None:
+            raise ValueError(f"Not a flashcard SVG: {symbol_id}")
+        view_box, body = match.groups()
+        defs = re.search(r"  <defs>\n(.*?)  </defs>\n", body, re.DOTALL)
+        if defs is not None:
+            for line in defs.group(1).splitlines():
+                glyph_id = re.search(r'id="([^"]*)"', line)
+                if glyph_id is not None:
+                    glyphs.setdefault(glyph_id.group(1), f"{line}\n")
+            body = body[: defs.start()] + body[defs.end() :]
+        body = re.sub(r'href="(?!data:|[a-z]+://|/|#)', f'href="{href_prefix}', body)
+        body = "".join(f"  {line}\n" for line in body.splitlines())
+        symbols.append(
+            f'  <symbol id="{symbol_id}" viewBox="{view_box}">\n{body}  </symbol>\n'
         )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg">\n'
+        + ("  <defs>\n" + "".join(glyphs.values()) + "  </defs>\n" if glyphs else "")
+        + "".join(symbols)
+        + "</svg>\n"
+    )
 
-        # Compute the image area between the letters box and word box, with margins.
-        max_w = layout.width - 2 * layout.margin
-        top_of_image_area = layout.letters_y + layout.letters_box_h + layout.margin
-        bottom_of_image_area = layout.word_y - layout.margin
-        available_image_height = bottom_of_image_area - top_of_image_area
-
-        fitted = fit_image(src_img, max_w=max_w, max_h=available_image_height)
-        img_w, img_h = fitted.size
-        img_x = int((layout.width - img_w) / 2)
-        img_y = int(top_of_image_area + (available_image_height - img_h) / 2)
-
-        # Prepare a canvas & draw for text
-        canvas = Image.new("RGB", (layout.width, layout.height), color=(255, 255, 255))
-        draw = ImageDraw.Draw(canvas)
 
-        # Text content
-        letters_text = f"{letter} {letter.lower()}"
-        word_text = word
+# ----------------------------------
+# Output encoding
+# ----------------------------------
 
-        # Determine fonts (auto-fit or manual override)
-        if letters_font_override is not None:
-            letters_font = load_font_exact(ttf_path, size=letters_font_override)
-            letters_px = letters_font_override
-        else:
-            letters_font, letters_px = autofit_font(
-                text=letters_text,
-                max_w=layout.letters_box_w,
-                max_h=layout.letters_box_h,
-                font_path=ttf_path,
-                start_size=32,
-                step=4,
+# Optional raster formats written next to the PNGs: format → (Pillow name, suffix).
+SIDE_FORMATS: Dict[str, Tuple[str, str]] = {
+    "webp": ("WEBP", ".webp"),
+    "avif": ("AVIF", ".avif"),
+}
+
+
+class EncodeOptions:
+    """How rendered cards are encoded."""
+
+    def __init__(
+        self,
+        png_compress_level: Optional[int] = None,
+        png_optimize: bool = False,
+        png_palette: int = 0,
+        side_formats: Iterable[str] = (),
+        lossy_quality: int = 90,
+        tile_size: int = 0,
+        tile_format: str = "png",
+    ) -> None:
+        # None keeps Pillow's default zlib level.
+        self.png_compress_level = png_compress_level
+        self.png_optimize = png_optimize
+        # Adaptive palette size for card PNGs; 0 keeps full RGB.
+        self.png_palette = png_palette
+        self.side_formats = tuple(side_formats)
+        self.lossy_quality = lossy_quality
+        # Deep zoom tile size (see deep_zoom_tiles); 0 writes no tiles.
+        self.tile_size = tile_size
+        self.tile_format = tile_format
+
+    def png_params(self) -> Dict[str, Any]:
+        """Image.save keyword arguments for PNG output."""
+        params: Dict[str, Any] = {}
+        if self.png_compress_level is not None:
+            params["compress_level"] = self.png_compress_level
+        if self.png_optimize:
+            params["optimize"] = True
+        return params
+
+    def describe(self) -> Dict[str, Any]:
+        """Settings that affect output bytes, for build manifest keys."""
+        return dict(vars(self))
+
+
+class EncodeStats:
+    """Files, bytes written and seconds spent encoding, per output format."""
+
+    def __init__(self) -> None:
+        self.formats: Dict[str, List[float]] = {}
+
+    def add(self, fmt: str, nbytes: int, seconds: float) -> None:
+        entry = self.formats.setdefault(fmt, [0, 0, 0.0])
+        entry[0] += 1
+        entry[1] += nbytes
+        entry[2] += seconds
+
+    def merge(self, other: EncodeStats) -> None:
+        for fmt, (count, nbytes, seconds) in other.formats.items():
+            entry = self.formats.setdefault(fmt, [0, 0, 0.0])
+            entry[0] += count
+            entry[1] += nbytes
+            entry[2] += seconds
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for fmt in sorted(self.formats):
+            count, nbytes, seconds = self.formats[fmt]
+            lines.append(
+                f"{fmt:<5} {int(count):>5} files {nbytes / 1e6:>9.2f} MB {seconds:>8.2f} s"
             )
+        return lines
 
-        if word_font_override is not None:
-            word_font = load_font_exact(ttf_path, size=word_font_override)
-            word_px = word_font_override
-        else:
-            word_font, word_px = autofit_font(
-                text=word_text,
-                max_w=layout.word_box_w,
-                max_h=layout.word_box_h,
-                font_path=ttf_path,
-                start_size=28,
-                step=3,
-            )
 
-        # ----- Draw top letters, GLYPH-CENTER aligned within the letters box -----
-        letters_bbox = draw.textbbox((0, 0), letters_text, font=letters_font)
+def encode_image(
+    img: Image.Image,
+    fmt: str,
+    stats: Optional[EncodeStats] = None,
+    stats_key: Optional[str] = None,
+    **params: Any,
+) -> bytes:
+    """Encode img in a Pillow format and record bytes and encode time."""
+    start = time.perf_counter()
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **params)
+    data = buf.getvalue()
+    if stats is not None:
+        stats.add(stats_key or fmt.lower(), len(data), time.perf_counter() - start)
+    return data
 
-        # Midline of the letters area
-        letters_center_line = layout.letters_y + layout.letters_box_h // 2
 
-        # Baseline so glyph center sits on the midline
-        letters_draw_y = int(
-            letters_center_line - (letters_bbox[1] + letters_bbox[3]) / 2
-        )
+def adler32_combine(adler1: int, adler2: int, len2: int) -> int:
+    """Adler-32 of A + B from adler32(A), adler32(B) and len(B) (as zlib's)."""
+    base = 65521
+    rem = len2 % base
+    sum1 = adler1 & 0xFFFF
+    sum2 = (rem * sum1) % base
+    sum1 += (adler2 & 0xFFFF) + base - 1
+    sum2 += (adler1 >> 16) + (adler2 >> 16) + base - rem
+    return (sum1 % base) | ((sum2 % base) << 16)
 
-        draw.text(
-            (layout.letters_x, letters_draw_y),
-            letters_text,
-            font=letters_font,
-            fill=letters_color_rgb,
-        )
 
-        # Paste illustration
-        canvas.paste(fitted, (img_x, img_y), fitted)
+def _png_rows(band: Image.Image, above: Image.Image, first_filter: int = 2) -> bytes:
+    """
+    Filtered PNG scanlines of band: "Up" (2) against the row above, computed for the
+    whole band at once with ImageChops. `above` is the row before the band.
+    """
+    width, rows = band.size
+    prior = Image.new(band.mode, band.size)
+    prior.paste(above, (0, 0))
+    if rows > 1:
+        prior.paste(band.crop((0, 0, width, rows - 1)), (0, 1))
+    filtered = ImageChops.subtract_modulo(band, prior).tobytes()
+    stride = len(filtered) // rows
+    raw = bytearray()
+    for offset in range(0, len(filtered), stride):
+        raw += b"\x02"
+        raw += filtered[offset : offset + stride]
+    if first_filter == 0:
+        raw[0] = 0
+        raw[1 : stride + 1] = band.crop((0, 0, width, 1)).tobytes()
+    return bytes(raw)
+
+
+class PngSegment:
+    """
+    A run of PNG rows compressed on its own, so it can be spliced into any
+    PngStreamWriter of the same width and mode (see PngStreamWriter.write_segment).
+    Its first row uses no filter, so it does not depend on the rows above it.
+    """
 
-        # ----- Draw bottom word centered, with GLYPH-CENTER vertical alignment -----
-        word_bbox = draw.textbbox((0, 0), word_text, font=word_font)
+    def __init__(self, band: Image.Image, compress_level: Optional[int] = None) -> None:
+        self.size = band.size
+        self.mode = band.mode
+        blank = Image.new(band.mode, (band.width, 1), 0)
+        raw = _png_rows(band, blank, first_filter=0)
+        deflate = zlib.compressobj(
+            6 if compress_level is None else compress_level, zlib.DEFLATED, -15
+        )
+        self.data = deflate.compress(raw) + deflate.flush(zlib.Z_FULL_FLUSH)
+        self.raw_length = len(raw)
+        self.adler = zlib.adler32(raw)
+        self.last_row = band.crop((0, band.height - 1, band.width, band.height))
 
-        # Midline of the word area
-        word_center_line = layout.word_y + layout.word_box_h // 2
 
-        # y for draw.text is the baseline; glyph center is at (top+bottom)/2 relative to baseline.
-        # So set: baseline_y = target_center - (top + bottom)/2
-        word_draw_y = int(word_center_line - (word_bbox[1] + word_bbox[3]) / 2)
+class PngStreamWriter:
+    """
+    Writes an 8-bit RGB or RGBA PNG band by band, so the full image never has to
+    exist in memory. Rows use the PNG "Up" filter, computed a band at a time with
+    ImageChops; flat regions of a card filter to zeros and compress well.
+    Pre-compressed PngSegments can be spliced in between bands without being
+    recompressed: the deflate stream is fully flushed before each one.
+    """
 
-        # Center horizontally
-        word_w = word_bbox[2] - word_bbox[0]
-        word_x = int(layout.width / 2 - word_w / 2)
+    _COLOR_TYPES: ClassVar[Dict[str, int]] = {"RGB": 2, "RGBA": 6}
+
+    def __init__(
+        self,
+        fh: Any,
+        size: Tuple[int, int],
+        mode: str = "RGB",
+        compress_level: Optional[int] = None,
+    ) -> None:
+        self._fh = fh
+        self.size = size
+        self.mode = mode
+        level = 6 if compress_level is None else compress_level
+        self._deflate = zlib.compressobj(level, zlib.DEFLATED, -15)
+        self._adler = zlib.adler32(b"")
+        self._last_row = Image.new(mode, (size[0], 1), 0)
+        self._rows = 0
+        self.bytes_written = 0
+        self._write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(
+            b"IHDR",
+            size[0].to_bytes(4, "big")
+            + size[1].to_bytes(4, "big")
+            + bytes((8, self._COLOR_TYPES[mode], 0, 0, 0)),
+        )
+        # zlib stream header (32K window, default compression).
+        self._pending = b"\x78\x9c"
+
+    def _write(self, data: bytes) -> None:
+        self._fh.write(data)
+        self.bytes_written += len(data)
+
+    def _chunk(self, chunk_type: bytes, data: bytes) -> None:
+        self._write(len(data).to_bytes(4, "big") + chunk_type + data)
+        self._write(zlib.crc32(data, zlib.crc32(chunk_type)).to_bytes(4, "big"))
+
+    def _idat(self, data: bytes) -> None:
+        data = self._pending + data
+        self._pending = b""
+        if data:
+            self._chunk(b"IDAT", data)
+
+    def write(self, band: Image.Image) -> None:
+        """Append the next band (same width and mode) below the rows written so far."""
+        raw = _png_rows(band, self._last_row)
+        self._adler = zlib.adler32(raw, self._adler)
+        self._idat(self._deflate.compress(raw))
+        self._last_row = band.crop((0, band.height - 1, band.width, band.height))
+        self._rows += band.height
+
+    def write_segment(self, segment: PngSegment) -> None:
+        """Append pre-compressed rows (same width and mode) as they are."""
+        if segment.size[0] != self.size[0] or segment.mode != self.mode:
+            raise ValueError("PNG segment does not match the image width and mode")
+        self._idat(self._deflate.flush(zlib.Z_FULL_FLUSH))
+        self._idat(segment.data)
+        self._adler = adler32_combine(self._adler, segment.adler, segment.raw_length)
+        self._last_row = segment.last_row
+        self._rows += segment.size[1]
+
+    def close(self) -> None:
+        if self._rows != self.size[1]:
+            raise ValueError(f"wrote {self._rows} of {self.size[1]} PNG rows")
+        self._idat(self._deflate.flush() + self._adler.to_bytes(4, "big"))
+        self._chunk(b"IEND", b"")
+
+
+def write_bytes(path: Path, data: bytes) -> None:
+    """
+    Write data to path atomically: readers see the old file or the complete new
+    one, never a partial write (the temporary name is unique per process and thread).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
-        draw.text((word_x, word_draw_y), word_text, font=word_font, fill=word_color_rgb)
 
-        out_png_path.parent.mkdir(parents=True, exist_ok=True)
-        canvas.save(out_png_path, format="PNG")
+class OutputWriter:
+    """
+    Writes output files on background threads, so the disk works on one card while
+    the next ones render. The queue is bounded: write() blocks once max_pending
+    files are waiting, which keeps memory in check when storage is slower than
+    rendering. close() waits for every queued file and re-raises the first error.
+    """
 
-        # --- SVG with same aligned Ys ---
-        b64_png = pil_to_base64_png(fitted)
-        svg_text = compose_svg(
-            canvas_w=layout.width,
-            canvas_h=layout.height,
-            letters_text=letters_text,
-            letters_fill=rgb_to_hex(letters_color_rgb),
-            word_text=word_text,
-            word_fill=rgb_to_hex(word_color_rgb),
-            word_font_family=svg_font_family,
-            letters_font_family=svg_font_family,
-            img_b64_png=b64_png,
-            img_x=img_x,
-            img_y=img_y,
-            img_w=img_w,
-            img_h=img_h,
-            letters_x=layout.letters_x,
-            letters_y=letters_draw_y,
-            word_center_x=int(layout.width / 2),
-            word_y=word_draw_y,
-            letters_font_px=letters_px,
-            word_font_px=word_px,
+    def __init__(
+        self, threads: int = 4, max_pending: int = 16, profile: bool = False
+    ) -> None:
+        self._queue: "queue.Queue[Optional[Tuple[Path, bytes]]]" = queue.Queue(
+            maxsize=max_pending
         )
-
-        out_svg_path.parent.mkdir(parents=True, exist_ok=True)
-        out_svg_path.write_text(svg_text, encoding="utf-8")
+        self._errors: List[Exception] = []
+        self._profilers = [Profiler(enabled=profile) for _ in range(threads)]
+        self._threads = [
+            threading.Thread(target=self._run, args=(profiler,), daemon=True)
+            for profiler in self._profilers
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _run(self, profiler: Profiler) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            path, data = item
+            profiler.card = path.stem
+            try:
+                with profiler.stage("write"):
+                    write_bytes(path, data)
+            except Exception as e:  # re-raised by write() or close()
+                self._errors.append(e)
+
+    @property
+    def events(self) -> List[Dict[str, Any]]:
+        """Profiler events of the writes, once closed."""
+        return [event for p in self._profilers for event in p.events]
+
+    def write(self, path: Path, data: bytes) -> None:
+        if self._errors:
+            raise self._errors[0]
+        self._queue.put((path, data))
+
+    def close(self) -> None:
+        if self._threads:
+            for _ in self._threads:
+                self._queue.put(None)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+        if self._errors:
+            raise self._errors[0]
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
 
 
 # ----------------------------------
-# CLI
+# Deep zoom tiles
 # ----------------------------------
 
+DZI_NS = "http://schemas.microsoft.com/deepzoom/2008"
+TILES_DIR = "tiles"
+# Pixels each tile shares with its neighbours, so viewers can blend tile seams.
+TILE_OVERLAP = 1
 
-def parse_args() -> argparse.Namespace:
+# --tile_format choices: (Pillow format, file extension, Pillow feature it needs).
+TILE_FORMATS: Dict[str, Tuple[str, str, str]] = {
+    "png": ("PNG", "png", "zlib"),
+    "jpeg": ("JPEG", "jpg", "jpg"),
+    "webp": ("WEBP", "webp", "webp"),
+}
+
+
+def deep_zoom_levels(width: int, height: int) -> int:
+    """Number of levels of a Deep Zoom pyramid: down to 1x1, halving each time."""
+    return (max(width, height) - 1).bit_length() + 1
+
+
+def deep_zoom_tiles(
+    canvas: Image.Image,
+    dzi_path: Path,
+    encode: EncodeOptions,
+    stats: Optional[EncodeStats] = None,
+) -> Iterator[Tuple[Path, bytes]]:
+    """
+    Cut a rendered card into a Deep Zoom (DZI) pyramid of encode.tile_size tiles,
+    as read by OpenSeadragon and similar viewers. The top level is the canvas
+    itself, and each level below is made from the one above with Image.reduce(2),
+    a 2x2 box average that halves the size (rounding up, as DZI expects). Levels
+    are never resampled from the full canvas. Yields (path, bytes) for every tile,
+    as DZI_FILES/<level>/<col>_<row>.<ext>, and then the .dzi descriptor, so a
+    descriptor on disk means its tiles were written before it.
+    """
+    pil_format, ext, _feature = TILE_FORMATS[encode.tile_format]
+    params = encode.png_params() if pil_format == "PNG" else {}
+    if pil_format != "PNG":
+        params["quality"] = encode.lossy_quality
+    size = encode.tile_size
+    files_dir = dzi_path.with_name(f"{dzi_path.stem}_files")
+
+    level_img = canvas
+    for level in reversed(range(deep_zoom_levels(*canvas.size))):
+        w, h = level_img.size
+        for row in range(-(-h // size)):
+            for col in range(-(-w // size)):
+                box = (
+                    max(col * size - TILE_OVERLAP, 0),
+                    max(row * size - TILE_OVERLAP, 0),
+                    min((col + 1) * size + TILE_OVERLAP, w),
+                    min((row + 1) * size + TILE_OVERLAP, h),
+                )
+                data = encode_image(
+                    level_img.crop(box),
+                    pil_format,
+                    stats=stats,
+                    stats_key="tiles",
+                    **params,
+                )
+                yield (files_dir / str(level) / f"{col}_{row}.{ext}", data)
+        if level:
+            level_img = level_img.reduce(2)
+
+    dzi = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<Image xmlns="{DZI_NS}" Format="{ext}" Overlap="{TILE_OVERLAP}" '
+        f'TileSize="{size}">\n'
+        f'  <Size Width="{canvas.width}" Height="{canvas.height}"/>\n'
+        "</Image>\n"
+    )
+    yield (dzi_path, dzi.encode("utf-8"))
+
+
+# ----------------------------------
+# Packaging
+# ----------------------------------
+
+ARCHIVE_FORMATS = ("zip", "tar.zst")
+
+# The earliest timestamp a zip entry can hold (1980-01-01 00:00 UTC); every entry
+# gets it unless SOURCE_DATE_EPOCH says otherwise.
+ARCHIVE_EPOCH = 315532800
+
+# Already-compressed formats, stored in zip archives without deflating them again.
+STORED_SUFFIXES = (".png", ".webp", ".avif")
+
+SVG_ASSET_HREF = re.compile(rb'href="(' + SVG_ASSETS_DIR.encode() + rb'/[^"/]+)"')
+
+
+def archive_mtime() -> int:
+    """Entry timestamp: SOURCE_DATE_EPOCH if set (see reproducible-builds.org)."""
+    value = os.environ.get("SOURCE_DATE_EPOCH")
+    return max(ARCHIVE_EPOCH, int(value)) if value else ARCHIVE_EPOCH
+
+
+class DeterministicArchive:
+    """
+    A zip or tar.zst archive whose bytes only depend on the entries added to it:
+    every entry gets the same timestamp, permissions and owner, and entries are
+    written in the order they are added. PNG, WebP and AVIF files are stored in
+    zips as-is; other files are deflated. Entries are streamed from bytes or from
+    files in 1 MB chunks, and the archive is renamed into place on close().
+    """
+
+    def __init__(self, path: Path, fmt: str = "zip", mtime: int = ARCHIVE_EPOCH):
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"unknown archive format {fmt!r}")
+        if fmt == "tar.zst" and zstandard is None:
+            raise RuntimeError("writing .tar.zst archives needs the zstandard module")
+        self.path = path
+        self.fmt = fmt
+        self.mtime = mtime
+        self.entries = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._tar: Optional[tarfile.TarFile] = None
+        # The file and the archive layers on top of it, closed innermost first.
+        try:
+            with contextlib.ExitStack() as files:
+                stream = files.enter_context(self._tmp_path.open("wb"))
+                if fmt == "zip":
+                    self._zip = files.enter_context(zipfile.ZipFile(stream, "w"))
+                else:
+                    stream = files.enter_context(
+                        zstandard.ZstdCompressor().stream_writer(stream, closefd=False)
+                    )
+                    self._tar = files.enter_context(
+                        tarfile.open(
+                            fileobj=stream, mode="w|", format=tarfile.PAX_FORMAT
+                        )
+                    )
+                self._files = files.pop_all()
+        except BaseException:
+            self._tmp_path.unlink(missing_ok=True)
+            raise
+
+    def add(self, arcname: str, source: Union[bytes, Path]) -> None:
+        if isinstance(source, bytes):
+            size = len(source)
+            stream: Any = contextlib.nullcontext(io.BytesIO(source))
+        else:
+            size = source.stat().st_size
+            stream = source.open("rb")
+        with stream as src:
+            if self._zip is not None:
+                info = zipfile.ZipInfo(arcname, time.gmtime(self.mtime)[:6])
+                info.create_system = 3  # Unix, whatever the build platform
+                info.external_attr = 0o100644 << 16
+                info.file_size = size
+                info.compress_type = (
+                    zipfile.ZIP_STORED
+                    if arcname.lower().endswith(STORED_SUFFIXES)
+                    else zipfile.ZIP_DEFLATED
+                )
+                with self._zip.open(info, "w") as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+            else:
+                info = tarfile.TarInfo(arcname)
+                info.size = size
+                info.mtime = self.mtime
+                info.mode = 0o644
+                self._tar.addfile(info, src)
+        self.entries += 1
+
+    def close(self) -> None:
+        try:
+            self._files.close()
+            self._tmp_path.replace(self.path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        self._files.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class DeckPackager:
+    """
+    Streams one output directory of a deck into a DeterministicArchive while the
+    deck is being built. `names` lists every card file expected in the archive;
+    they are written sorted by name, each as soon as it and all the names before
+    it have arrived through add(), so with a sorted mapping every card goes into
+    the archive straight from the renderer's bytes. Out-of-order cards wait in
+    memory. Illustrations referenced by external-mode SVGs are collected from the
+    SVGs and appended in sorted order by close(), from disk.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        fmt: str,
+        folder: Path,
+        names: Iterable[str],
+        mtime: int = ARCHIVE_EPOCH,
+    ) -> None:
+        self.archive = DeterministicArchive(path, fmt, mtime)
+        self.folder = folder
+        self._order = sorted(set(names))
+        self._next = 0
+        self._waiting: Dict[str, Union[bytes, Path]] = {}
+        self._assets: Set[str] = set()
+
+    def add(self, arcname: str, path: Path, data: Optional[bytes] = None) -> None:
+        """Add the file `path` (or its freshly encoded bytes) as `arcname`."""
+        if arcname.endswith(".svg"):
+            svg = data if data is not None else path.read_bytes()
+            self._assets.update(m.decode() for m in SVG_ASSET_HREF.findall(svg))
+        self._waiting[arcname] = data if data is not None else path
+        while self._next < len(self._order):
+            name = self._order[self._next]
+            if name not in self._waiting:
+                break
+            self.archive.add(name, self._waiting.pop(name))
+            self._next += 1
+
+    def close(self) -> int:
+        """Finish the archive (after the outputs are on disk); returns its entry count."""
+        try:
+            if self._next < len(self._order):
+                missing = self._order[self._next]
+                raise RuntimeError(f"{missing} was never added to {self.archive.path}")
+            for name in sorted(self._assets):
+                self.archive.add(name, self.folder / name)
+        except BaseException:
+            self.archive.abort()
+            raise
+        self.archive.close()
+        return self.archive.entries
+
+    def abort(self) -> None:
+        self.archive.abort()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: object, *exc: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+# ----------------------------------
+# Imposition (print sheets)
+# ----------------------------------
+
+# Paper sizes for --sheet, in inches (portrait).
+PAPER_SIZES: Dict[str, Tuple[float, float]] = {
+    "letter": (8.5, 11.0),
+    "a4": (210 / 25.4, 297 / 25.4),
+}
+SHEETS_DIR = "sheets"
+SHEETS_PDF = "flashcards-sheets.pdf"
+
+
+def png_idat_stream(png: bytes) -> Tuple[int, int, bytes]:
+    """
+    Return (width, height, zlib stream) of an 8-bit, non-interlaced RGB PNG.
+
+    The concatenated IDAT data is a FlateDecode stream with PNG predictors, which a
+    PDF image can reference directly, so a sheet is only ever compressed once.
+    """
+    pos = 8
+    width = height = 0
+    idat = []
+    while pos < len(png):
+        length = int.from_bytes(png[pos : pos + 4], "big")
+        chunk_type = png[pos + 4 : pos + 8]
+        data = png[pos + 8 : pos + 8 + length]
+        if chunk_type == b"IHDR":
+            width = int.from_bytes(data[0:4], "big")
+            height = int.from_bytes(data[4:8], "big")
+            if data[8:10] != b"\x08\x02" or data[12] != 0:
+                raise ValueError("expected an 8-bit, non-interlaced RGB PNG")
+        elif chunk_type == b"IDAT":
+            idat.append(data)
+        elif chunk_type == b"IEND":
+            break
+        pos += length + 12
+    return (width, height, b"".join(idat))
+
+
+class PdfSheetWriter:
+    """
+    Minimal streaming PDF writer with one full-page image per page.
+
+    Pages are written as they are added; only their object offsets are kept, and the
+    page tree and cross-reference table are written by close(). The file is built
+    under a temporary name and renamed into place when complete; abort() discards it.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._files = contextlib.ExitStack()
+        self._fh = self._files.enter_context(self._tmp_path.open("wb"))
+        self._fh.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        # Objects 1 and 2 (catalog and page tree) are written last.
+        self._offsets: Dict[int, int] = {}
+        self._next_id = 3
+        self._pages: List[int] = []
+
+    def _write_object(self, body: bytes, stream: Optional[bytes] = None) -> int:
+        obj_id = self._next_id
+        self._next_id += 1
+        self._write_object_at(obj_id, body, stream)
+        return obj_id
+
+    def _write_object_at(
+        self, obj_id: int, body: bytes, stream: Optional[bytes] = None
+    ) -> None:
+        self._offsets[obj_id] = self._fh.tell()
+        self._fh.write(b"%d 0 obj\n" % obj_id + body)
+        if stream is not None:
+            self._fh.write(b"\nstream\n" + stream + b"\nendstream")
+        self._fh.write(b"\nendobj\n")
+
+    def add_png_page(self, png: bytes, dpi: int) -> None:
+        """Add a page showing `png` (8-bit RGB) at `dpi`, sized to the image."""
+        width, height, data = png_idat_stream(png)
+        image_id = self._write_object(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+            b"/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /FlateDecode "
+            b"/DecodeParms << /Predictor 15 /Colors 3 /BitsPerComponent 8 "
+            b"/Columns %d >> /Length %d >>" % (width, height, width, len(data)),
+            data,
+        )
+        page_w = width * 72 / dpi
+        page_h = height * 72 / dpi
+        content = b"q %.4f 0 0 %.4f 0 0 cm /Im0 Do Q" % (page_w, page_h)
+        content_id = self._write_object(b"<< /Length %d >>" % len(content), content)
+        self._pages.append(
+            self._write_object(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.4f %.4f] "
+                b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+                % (page_w, page_h, image_id, content_id)
+            )
+        )
+
+    def close(self) -> None:
+        kids = b" ".join(b"%d 0 R" % page for page in self._pages)
+        self._write_object_at(
+            2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self._pages))
+        )
+        self._write_object_at(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        xref_offset = self._fh.tell()
+        self._fh.write(b"xref\n0 %d\n0000000000 65535 f \n" % self._next_id)
+        for obj_id in range(1, self._next_id):
+            self._fh.write(b"%010d 00000 n \n" % self._offsets[obj_id])
+        self._fh.write(
+            b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (self._next_id, xref_offset)
+        )
+        self._files.close()
+        self._tmp_path.replace(self.path)
+
+    def abort(self) -> None:
+        self._files.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class SheetImposer:
+    """
+    Tiles cards N-up onto printable sheets with cut marks.
+
+    Cards are pasted one at a time as they become available, so only the current
+    sheet and one card are held in memory. A full sheet is PNG-encoded once; the
+    same bytes are written as sheets/sheet-NN.png and embedded as a page of the
+    PDF. Cards are scaled to the largest size that fits the grid cells. Used as a
+    context manager, the sheets are finished on success and the PDF is discarded
+    on an error.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path,
+        layout: Layout,
+        paper: str = "letter",
+        grid: Tuple[int, int] = (2, 2),
+        dpi: int = 300,
+        margin_in: float = 0.25,
+        gutter_in: float = 0.25,
+        encode: Optional[EncodeOptions] = None,
+        stats: Optional[EncodeStats] = None,
+    ) -> None:
+        self.sheet_dir = out_dir / SHEETS_DIR
+        self.dpi = dpi
+        self.cols, self.rows = grid
+        self.encode = encode or EncodeOptions()
+        self.stats = stats
+
+        paper_w, paper_h = PAPER_SIZES[paper]
+        self.sheet_size = (round(paper_w * dpi), round(paper_h * dpi))
+        margin = round(margin_in * dpi)
+        self.gutter = round(gutter_in * dpi)
+        usable_w = self.sheet_size[0] - 2 * margin - (self.cols - 1) * self.gutter
+        usable_h = self.sheet_size[1] - 2 * margin - (self.rows - 1) * self.gutter
+        cell_w = usable_w // self.cols
+        cell_h = usable_h // self.rows
+        if cell_w <= 0 or cell_h <= 0:
+            raise ValueError(f"a {self.cols}x{self.rows} grid does not fit on {paper}")
+        scale = min(cell_w / layout.width, cell_h / layout.height)
+        self.card_size = (int(layout.width * scale), int(layout.height * scale))
+        grid_w = self.cols * self.card_size[0] + (self.cols - 1) * self.gutter
+        grid_h = self.rows * self.card_size[1] + (self.rows - 1) * self.gutter
+        self.origin = (
+            (self.sheet_size[0] - grid_w) // 2,
+            (self.sheet_size[1] - grid_h) // 2,
+        )
+
+        self.pdf = PdfSheetWriter(out_dir / SHEETS_PDF)
+        self.pages = 0
+        self._sheet: Optional[Image.Image] = None
+        self._slots: List[Tuple[int, int, int, int]] = []
+
+    def add(self, card: Image.Image) -> None:
+        """Place the next card, flushing the current sheet when it is full."""
+        if self._sheet is None:
+            self._sheet = Image.new("RGB", self.sheet_size, (255, 255, 255))
+        index = len(self._slots)
+        x = self.origin[0] + (index % self.cols) * (self.card_size[0] + self.gutter)
+        y = self.origin[1] + (index // self.cols) * (self.card_size[1] + self.gutter)
+        if card.size != self.card_size:
+            card = card.resize(self.card_size, Image.LANCZOS, reducing_gap=3.0)
+        self._sheet.paste(card.convert("RGB"), (x, y))
+        self._slots.append((x, y, x + self.card_size[0], y + self.card_size[1]))
+        if len(self._slots) == self.cols * self.rows:
+            self._flush()
+
+    def _draw_cut_marks(self) -> None:
+        """Draw corner marks in the margins and gutters, never over a card."""
+        draw = ImageDraw.Draw(self._sheet)
+        gap = max(1, self.dpi // 32)
+        length = max(gap + 1, min(self.dpi // 6, self.gutter))
+        width = max(1, self.dpi // 150)
+        sheet_w, sheet_h = self.sheet_size
+
+        def clear(x0: int, y0: int, x1: int, y1: int) -> bool:
+            return all(
+                x1 < sx0 or x0 > sx1 or y1 < sy0 or y0 > sy1
+                for sx0, sy0, sx1, sy1 in self._slots
+            )
+
+        for x0, y0, x1, y1 in self._slots:
+            for cx, dx in ((x0, -1), (x1, 1)):
+                for cy, dy in ((y0, -1), (y1, 1)):
+                    # Horizontal mark on the card's top/bottom edge line, and a
+                    # vertical one on its left/right edge line, pointing outwards.
+                    hx = sorted((cx + dx * gap, cx + dx * length))
+                    vy = sorted((cy + dy * gap, cy + dy * length))
+                    if clear(hx[0], cy, hx[1], cy) and 0 <= hx[0] and hx[1] < sheet_w:
+                        draw.line((hx[0], cy, hx[1], cy), fill=(0, 0, 0), width=width)
+                    if clear(cx, vy[0], cx, vy[1]) and 0 <= vy[0] and vy[1] < sheet_h:
+                        draw.line((cx, vy[0], cx, vy[1]), fill=(0, 0, 0), width=width)
+
+    def _flush(self) -> None:
+        if self._sheet is None:
+            return
+        self._draw_cut_marks()
+        params = dict(self.encode.png_params(), dpi=(self.dpi, self.dpi))
+        png = encode_image(
+            self._sheet, "PNG", stats=self.stats, stats_key="sheet", **params
+        )
+        self.pages += 1
+        write_bytes(sheet_path(self.sheet_dir, self.pages), png)
+        self.pdf.add_png_page(png, self.dpi)
+        self._sheet = None
+        self._slots = []
+
+    def close(self) -> int:
+        """Write the last partial sheet and finish the PDF; returns the page count."""
+        self._flush()
+        self.pdf.close()
+        # Drop pages left over from an earlier, longer run.
+        for stale in self.sheet_dir.glob("sheet-*.png"):
+            if int(stale.stem.split("-")[1]) > self.pages:
+                stale.unlink()
+        return self.pages
+
+    def abort(self) -> None:
+        self.pdf.abort()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type: object, *exc: object) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def sheet_path(sheet_dir: Path, page: int) -> Path:
+    """Path of the PNG of sheet number `page` (1-based)."""
+    return sheet_dir / f"sheet-{page:02d}.png"
+
+
+# ----------------------------------
+# Instrumentation
+# ----------------------------------
+
+
+def peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in KiB, or None if unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+_NULL_STAGE = contextlib.nullcontext()
+
+
+class Profiler:
+    """
+    Records wall time, CPU time and peak RSS for each stage of each card.
+
+    A disabled profiler hands out a shared no-op context manager, so instrumented
+    code costs one attribute check per stage when profiling is off. Events are
+    plain dicts so worker processes can return them to the parent.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self.card = ""
+        self.events: List[Dict[str, Any]] = []
+
+    def stage(self, name: str, size: str = "") -> contextlib.AbstractContextManager:
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._measure(name, size)
+
+    @contextlib.contextmanager
+    def _measure(self, name: str, size: str):
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self.events.append(
+                {
+                    "card": self.card,
+                    "size": size,
+                    "stage": name,
+                    "start": start,
+                    "wall": time.perf_counter() - start,
+                    "cpu": time.process_time() - cpu_start,
+                    "peak_rss_kb": peak_rss_kb(),
+                    "pid": os.getpid(),
+                }
+            )
+
+
+NULL_PROFILER = Profiler(enabled=False)
+
+
+def profile_summary_lines(events: List[Dict[str, Any]], top: int = 5) -> List[str]:
+    """Format per-stage totals and the slowest cards as a text table."""
+    stages: Dict[str, List[float]] = {}
+    cards: Dict[str, float] = {}
+    for event in events:
+        entry = stages.setdefault(event["stage"], [0, 0.0, 0.0, 0])
+        entry[0] += 1
+        entry[1] += event["wall"]
+        entry[2] += event["cpu"]
+        entry[3] = max(entry[3], event["peak_rss_kb"] or 0)
+        if event["card"]:
+            cards[event["card"]] = cards.get(event["card"], 0.0) + event["wall"]
+
+    lines = [
+        f"{'stage':<14} {'calls':>6} {'wall s':>9} {'cpu s':>9} {'mean ms':>9} {'peak RSS MB':>12}"
+    ]
+    for name, (count, wall, cpu, rss) in sorted(
+        stages.items(), key=lambda kv: -kv[1][1]
+    ):
+        lines.append(
+            f"{name:<14} {int(count):>6} {wall:>9.3f} {cpu:>9.3f} "
+            f"{wall / count * 1e3:>9.2f} {rss / 1024:>12.1f}"
+        )
+    if cards:
+        lines.append("")
+        lines.append("Slowest cards (wall s):")
+        for card, wall in sorted(cards.items(), key=lambda kv: -kv[1])[:top]:
+            lines.append(f"  {wall:>8.3f}  {card}")
+    return lines
+
+
+def chrome_trace(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Convert profiler events to the Chrome trace format (chrome://tracing, Perfetto)."""
+    origin = min((e["start"] for e in events), default=0.0)
+    return {
+        "traceEvents": [
+            {
+                "name": e["stage"],
+                "cat": "flashcards",
+                "ph": "X",
+                "ts": (e["start"] - origin) * 1e6,
+                "dur": e["wall"] * 1e6,
+                "pid": e["pid"],
+                "tid": e["pid"],
+                "args": {
+                    "card": e["card"],
+                    "size": e["size"],
+                    "cpu_ms": e["cpu"] * 1e3,
+                    "peak_rss_kb": e["peak_rss_kb"],
+                },
+            }
+            for e in events
+        ],
+        "displayTimeUnit": "ms",
+    }
+
+
+# ----------------------------------
+# Build manifest (incremental builds)
+# ----------------------------------
+
+MANIFEST_NAME = ".flashcards-manifest.json"
+MANIFEST_VERSION = 1
+
+
+class BuildManifest:
+    """
+    Content-addressed record of what was built into an output directory.
+
+    Each card is stored with a key hashed from all of its render inputs; a card whose
+    key is unchanged and whose outputs still exist does not need to be rendered again.
+    File digests are memoized by (size, mtime) so unchanged sources are not re-read;
+    pass known_files to share that memo between the manifests of several decks.
+    """
+
+    def __init__(
+        self, out_dir: Path, known_files: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> None:
+        self.path = out_dir / MANIFEST_NAME
+        self.out_dir = out_dir
+        self.known_files = known_files if known_files is not None else {}
+        self.cards: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.font_sizes: Dict[str, int] = {}
+        self.packages: Dict[str, str] = {}
+        self.sheets: Dict[str, Dict[str, Any]] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        if data.get("version") != MANIFEST_VERSION:
+            return
+        self.cards = data.get("cards", {})
+        self.files = data.get("files", {})
+        self.font_sizes = data.get("font_sizes", {})
+        self.packages = data.get("packages", {})
+        self.sheets = data.get("sheets", {})
+
+    def file_digest(self, path: Path) -> str:
+        """Return the SHA-256 of a file, reusing the stored digest if size and mtime match."""
+        stat = path.stat()
+        key = str(path.resolve())
+        for entry in (self.files.get(key), self.known_files.get(key)):
+            if (
+                entry is not None
+                and entry["size"] == stat.st_size
+                and entry["mtime_ns"] == stat.st_mtime_ns
+            ):
+                self.files[key] = entry
+                return entry["sha256"]
+        sha = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        self.files[key] = self.known_files[key] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest,
+        }
+        return digest
+
+    def is_current(self, name: str, key: str, outputs: Iterable[Path]) -> bool:
+        """True if `name` was last built from `key` and all of its outputs still exist."""
+        entry = self.cards.get(name)
+        if entry is None or entry.get("key") != key:
+            return False
+        return all(p.exists() for p in outputs)
+
+    def record(self, name: str, key: str, outputs: Iterable[Path]) -> None:
+        self.cards[name] = {
+            "key": key,
+            "outputs": [str(p.relative_to(self.out_dir)) for p in outputs],
+        }
+
+    def retain(self, names: Iterable[str]) -> None:
+        """Drop card entries that are no longer part of the deck."""
+        keep = set(names)
+        self.cards = {k: v for k, v in self.cards.items() if k in keep}
+
+    def save(self) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "cards": self.cards,
+            "files": self.files,
+            "font_sizes": self.font_sizes,
+            "packages": self.packages,
+            "sheets": self.sheets,
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, indent=2, sort_keys=True), encoding="utf-8")
+        tmp.replace(self.path)
+
+
+# ----------------------------------
+# Build Logic
+# ----------------------------------
+
+
+def image_area_size(layout: Layout) -> Tuple[int, int]:
+    """Return (max_w, max_h) of the illustration area between the two text boxes."""
+    max_w = layout.width - 2 * layout.margin
+    top_of_image_area = layout.letters_y + layout.letters_box_h + layout.margin
+    bottom_of_image_area = layout.word_y - layout.margin
+    return (max_w, bottom_of_image_area - top_of_image_area)
+
+
+def card_placement(
+    layout: Layout,
+    fitted_wh: Tuple[int, int],
+    letters_text: str,
+    word_text: str,
+    letters_font: ImageFont.ImageFont,
+    word_font: ImageFont.ImageFont,
+) -> Tuple[int, int, int, int, int]:
+    """
+    Return (img_x, img_y, letters_y, word_x, word_y): where the fitted illustration
+    goes and the draw positions of both texts.
+    """
+    # Compute the image area between the letters box and word box, with margins.
+    _max_w, available_image_height = image_area_size(layout)
+    top_of_image_area = layout.letters_y + layout.letters_box_h + layout.margin
+
+    img_w, img_h = fitted_wh
+    img_x = int((layout.width - img_w) / 2)
+    img_y = int(top_of_image_area + (available_image_height - img_h) / 2)
+
+    # ----- Top letters, GLYPH-CENTER aligned within the letters box -----
+    letters_bbox = text_bbox(letters_text, letters_font)
+
+    # Midline of the letters area
+    letters_center_line = layout.letters_y + layout.letters_box_h // 2
+
+    # Baseline so glyph center sits on the midline
+    letters_draw_y = int(
+        letters_center_line - (letters_bbox[1] + letters_bbox[3]) / 2
+    )
+
+    # ----- Bottom word centered, with GLYPH-CENTER vertical alignment -----
+    word_bbox = text_bbox(word_text, word_font)
+
+    # Midline of the word area
+    word_center_line = layout.word_y + layout.word_box_h // 2
+
+    # y for draw.text is the baseline; glyph center is at (top+bottom)/2 relative to baseline.
+    # So set: baseline_y = target_center - (top + bottom)/2
+    word_draw_y = int(word_center_line - (word_bbox[1] + word_bbox[3]) / 2)
+
+    # Center horizontally
+    word_w = word_bbox[2] - word_bbox[0]
+    word_x = int(layout.width / 2 - word_w / 2)
+
+    return (img_x, img_y, letters_draw_y, word_x, word_draw_y)
+
+
+def draw_card(
+    canvas: Image.Image,
+    placement: Tuple[int, int, int, int, int],
+    layout: Layout,
+    letters_text: str,
+    word_text: str,
+    letters_font: ImageFont.ImageFont,
+    word_font: ImageFont.ImageFont,
+    letters_color_rgb: Tuple[int, int, int],
+    word_color_rgb: Tuple[int, int, int],
+    fitted: Optional[Image.Image],
+    fitted_y: int,
+    top: int = 0,
+) -> None:
+    """
+    Draw letters, illustration and word onto canvas, which holds the card rows
+    starting at `top` (a horizontal band of the card, or all of it). `fitted` is
+    pasted with its top edge at card row fitted_y.
+    """
+    img_x, _img_y, letters_draw_y, word_x, word_draw_y = placement
+    draw_text(
+        canvas,
+        (layout.letters_x, letters_draw_y - top),
+        letters_text,
+        letters_font,
+        letters_color_rgb,
+    )
+    if fitted is not None:
+        canvas.paste(fitted, (img_x, fitted_y - top), fitted)
+    word_xy = (word_x, word_draw_y - top)
+    draw_text(canvas, word_xy, word_text, word_font, word_color_rgb)
+
+
+def render_canvas(
+    letters_text: str,
+    word_text: str,
+    fitted: Image.Image,
+    layout: Layout,
+    letters_font: ImageFont.ImageFont,
+    word_font: ImageFont.ImageFont,
+    letters_color_rgb: Tuple[int, int, int],
+    word_color_rgb: Tuple[int, int, int],
+) -> Tuple[Image.Image, Tuple[int, int, int, int]]:
+    """
+    Draw the raster card: letters, the fitted illustration and the word.
+    Returns (canvas, (img_x, img_y, letters_y, word_y)); the text y values are the
+    draw positions, which the SVG reuses so both outputs line up.
+    """
+    canvas = Image.new("RGB", (layout.width, layout.height), color=(255, 255, 255))
+    placement = card_placement(
+        layout,
+        fitted.size,
+        letters_text,
+        word_text,
+        letters_font,
+        word_font,
+    )
+    img_x, img_y, letters_draw_y, _word_x, word_draw_y = placement
+    draw_card(
+        canvas,
+        placement,
+        layout,
+        letters_text,
+        word_text,
+        letters_font,
+        word_font,
+        letters_color_rgb,
+        word_color_rgb,
+        fitted,
+        img_y,
+    )
+    return (canvas, (img_x, img_y, letters_draw_y, word_draw_y))
+
+
+def full_render_bytes(layout: Layout, fitted_wh: Tuple[int, int]) -> int:
+    """Rough peak memory of rendering a card in one piece: canvas plus fitted image."""
+    # RGB canvas, and the fitted RGBA image with its premultiplied resize copy.
+    return layout.width * layout.height * 3 + fitted_wh[0] * fitted_wh[1] * 8
+
+
+def band_rows_within(
+    memory_limit: int, layout: Layout, fitted_wh: Tuple[int, int], src_img: Image.Image
+) -> int:
+    """Rows per band that keep a banded render of one card within memory_limit."""
+    # The premultiplied source copy lives for the whole card; per band there are the
+    # canvas band with its filtered copies and the fitted band with its resize copy.
+    fixed = src_img.width * src_img.height * 4
+    per_row = layout.width * 3 * 4 + fitted_wh[0] * 4 * 3
+    return max(1, (memory_limit - fixed) // per_row)
+
+
+def fitted_band(
+    premultiplied: Image.Image,
+    fitted_wh: Tuple[int, int],
+    first_row: int,
+    end_row: int,
+    draft: bool = False,
+) -> Image.Image:
+    """
+    Rows [first_row, end_row) of the illustration fitted to fitted_wh, resampled
+    straight from the (RGBa) source, so the full fitted image is never allocated.
+    Pillow derives the filter weights from the band's box, so their rounding can
+    differ from one full resize: a few pixels per card end up 1-2 levels apart.
+    """
+    scale = premultiplied.height / fitted_wh[1]
+    band = premultiplied.resize(
+        (fitted_wh[0], end_row - first_row),
+        Image.BILINEAR if draft else Image.LANCZOS,
+        box=(0, first_row * scale, premultiplied.width, end_row * scale),
+    )
+    return band.convert("RGBA")
+
+
+def encode_fitted_banded(
+    premultiplied: Image.Image,
+    fitted_wh: Tuple[int, int],
+    band_rows: int,
+    compress_level: Optional[int] = None,
+    draft: bool = False,
+) -> bytes:
+    """PNG bytes of the fitted illustration, resampled and encoded band by band."""
+    buf = io.BytesIO()
+    writer = PngStreamWriter(buf, fitted_wh, "RGBA", compress_level)
+    for top in range(0, fitted_wh[1], band_rows):
+        end = min(fitted_wh[1], top + band_rows)
+        writer.write(fitted_band(premultiplied, fitted_wh, top, end, draft))
+    writer.close()
+    return buf.getvalue()
+
+
+def render_png_banded(
+    out_png_path: Path,
+    premultiplied: Image.Image,
+    fitted_wh: Tuple[int, int],
+    placement: Tuple[int, int, int, int, int],
+    band_rows: int,
+    layout: Layout,
+    letters_text: str,
+    word_text: str,
+    letters_font: ImageFont.ImageFont,
+    word_font: ImageFont.ImageFont,
+    letters_color_rgb: Tuple[int, int, int],
+    word_color_rgb: Tuple[int, int, int],
+    compress_level: Optional[int] = None,
+    draft: bool = False,
+) -> int:
+    """
+    Compose and encode the card PNG in horizontal bands of band_rows rows, writing
+    each band to disk as it is done. Returns the number of bytes written.
+    """
+    img_y = placement[1]
+    fitted_end = img_y + fitted_wh[1]
+    tmp_path = out_png_path.with_name(f"{out_png_path.name}.{os.getpid()}.tmp")
+    out_png_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(tmp_path, "wb") as fh:
+        size = (layout.width, layout.height)
+        writer = PngStreamWriter(fh, size, "RGB", compress_level)
+        for top in range(0, layout.height, band_rows):
+            end = min(layout.height, top + band_rows)
+            band = Image.new("RGB", (layout.width, end - top), (255, 255, 255))
+            fitted = None
+            first = max(top, img_y)
+            if first < min(end, fitted_end):
+                fitted = fitted_band(
+                    premultiplied,
+                    fitted_wh,
+                    first - img_y,
+                    min(end, fitted_end) - img_y,
+                    draft,
+                )
+            draw_card(
+                band,
+                placement,
+                layout,
+                letters_text,
+                word_text,
+                letters_font,
+                word_font,
+                letters_color_rgb,
+                word_color_rgb,
+                fitted,
+                first,
+                top=top,
+            )
+            writer.write(band)
+        writer.close()
+    tmp_path.replace(out_png_path)
+    return writer.bytes_written
+
+
+def card_fonts(
+    letters_text: str,
+    word_text: str,
+    layout: Layout,
+    ttf_path: Optional[Path],
+    letters_font_override: Optional[int],
+    word_font_override: Optional[int],
+) -> Tuple[ImageFont.ImageFont, int, ImageFont.ImageFont, int]:
+    """Return (letters_font, letters_px, word_font, word_px), auto-fit unless overridden."""
+    if letters_font_override is not None:
+        letters_font = load_font_exact(ttf_path, size=letters_font_override)
+        letters_px = letters_font_override
+    else:
+        letters_font, letters_px = autofit_font(
+            text=letters_text,
+            max_w=layout.letters_box_w,
+            max_h=layout.letters_box_h,
+            font_path=ttf_path,
+            start_size=32,
+            step=4,
+        )
+
+    if word_font_override is not None:
+        word_font = load_font_exact(ttf_path, size=word_font_override)
+        word_px = word_font_override
+    else:
+        word_font, word_px = autofit_font(
+            text=word_text,
+            max_w=layout.word_box_w,
+            max_h=layout.word_box_h,
+            font_path=ttf_path,
+            start_size=28,
+            step=3,
+        )
+    return (letters_font, letters_px, word_font, word_px)
+
+
+def build_flashcard_for_pair(
+    letter: str,
+    word: str,
+    illustration_path: Path,
+    out_svg_path: Path,
+    out_png_path: Path,
+    layout: Layout,
+    letters_color_rgb: Tuple[int, int, int],
+    word_color_rgb: Tuple[int, int, int],
+    svg_font_family: str,
+    ttf_path: Optional[Path],
+    letters_font_override: Optional[int],
+    word_font_override: Optional[int],
+    crop_cache_dir: Optional[Path] = None,
+    illustration_digest: Optional[str] = None,
+    src_img: Optional[Image.Image] = None,
+    draft: bool = False,
+    write_svg: bool = True,
+    encode: Optional[EncodeOptions] = None,
+    out_side_paths: Optional[Dict[str, Path]] = None,
+    out_tiles_path: Optional[Path] = None,
+    stats: Optional[EncodeStats] = None,
+    svg_mode: str = "inline",
+    svg_text: str = "text",
+    profiler: Optional[Profiler] = None,
+    memory_limit: Optional[int] = None,
+    write: Callable[[Path, bytes], None] = write_bytes,
+) -> None:
+    """
+    Render both SVG and PNG flashcards for (letter, word).
+    Pass src_img (as returned by load_illustration) to reuse an already decoded and
+    cropped illustration, e.g. when rendering the same card at several sizes.
+    draft=True trades quality for speed (see fit_image); write_svg=False skips the
+    SVG and its second PNG encode. `encode` controls PNG settings, and
+    out_side_paths maps extra formats (see SIDE_FORMATS) to output paths, and
+    out_tiles_path is the .dzi of a deep zoom pyramid (see deep_zoom_tiles).
+    Bytes written and encode time are added to `stats`.
+    With svg_mode "external" (or "sprite"), the fitted illustration is written once
+    as a content-addressed PNG under the SVG's assets/ directory and referenced by
+    relative href instead of being inlined as base64. With svg_text "paths", the
+    letters and word are drawn as outlines from ttf_path (see glyph_paths_svg).
+    Stage timings are recorded on `profiler` when given.
+    If rendering the card in one piece would exceed memory_limit (bytes), it is
+    composed and encoded in horizontal bands instead (see render_png_banded). The
+    text and layout are the same, but a few illustration pixels may differ by 1-2
+    levels (see fitted_band), and palette, side formats and tiles are not available.
+    Encoded files are passed to `write` (path, bytes); banded PNGs are streamed
+    straight to disk.
+    """
+    encode = encode or EncodeOptions()
+    profiler = profiler or NULL_PROFILER
+    size = f"{layout.width}x{layout.height}"
+    if src_img is None:
+        # Trim transparent or near-white borders so all illustrations scale consistently
+        src_img = load_illustration(
+            illustration_path,
+            crop_cache_dir=crop_cache_dir,
+            source_digest=illustration_digest,
+            draft_size=(layout.width, layout.height) if draft else None,
+            profiler=profiler,
+            memory_limit=memory_limit,
+        )
+
+    max_w, available_image_height = image_area_size(layout)
+    fitted_wh = fitted_size(src_img.size, max_w, available_image_height)
+    banded = memory_limit is not None
+    banded = banded and full_render_bytes(layout, fitted_wh) > memory_limit
+    if banded and (encode.png_palette or out_side_paths or out_tiles_path):
+        raise ValueError(
+            f"{out_png_path.name}: --png_palette, --side_formats and --tiles need the "
+            "whole card in memory, which exceeds the memory limit"
+        )
+    fitted = None
+    if not banded:
+        with profiler.stage("fit", size):
+            fitted = fit_image(
+                src_img, max_w=max_w, max_h=available_image_height, draft=draft
+            )
+
+    # Text content
+    letters_text = f"{letter} {letter.lower()}"
+    word_text = word
+
+    # Determine fonts (auto-fit or manual override)
+    with profiler.stage("fonts", size):
+        letters_font, letters_px, word_font, word_px = card_fonts(
+            letters_text,
+            word_text,
+            layout,
+            ttf_path,
+            letters_font_override,
+            word_font_override,
+        )
+
+    if banded:
+        with profiler.stage("banded_render", size):
+            premultiplied = src_img.convert("RGBa")
+            band_rows = band_rows_within(memory_limit, layout, fitted_wh, src_img)
+            placement = card_placement(
+                layout,
+                fitted_wh,
+                letters_text,
+                word_text,
+                letters_font,
+                word_font,
+            )
+            start = time.perf_counter()
+            written = render_png_banded(
+                out_png_path,
+                premultiplied,
+                fitted_wh,
+                placement,
+                band_rows,
+                layout,
+                letters_text,
+                word_text,
+                letters_font,
+                word_font,
+                letters_color_rgb,
+                word_color_rgb,
+                compress_level=encode.png_compress_level,
+                draft=draft,
+            )
+            if stats is not None:
+                stats.add("png", written, time.perf_counter() - start)
+        img_x, img_y, letters_draw_y, _word_x, word_draw_y = placement
+        img_w, img_h = fitted_wh
+    else:
+        with profiler.stage("compose", size):
+            canvas, placement = render_canvas(
+                letters_text=letters_text,
+                word_text=word_text,
+                fitted=fitted,
+                layout=layout,
+                letters_font=letters_font,
+                word_font=word_font,
+                letters_color_rgb=letters_color_rgb,
+                word_color_rgb=word_color_rgb,
+            )
+        img_x, img_y, letters_draw_y, word_draw_y = placement
+        img_w, img_h = fitted.size
+
+        with profiler.stage("png_encode", size):
+            png_image = canvas
+            if encode.png_palette:
+                # Cards are mostly flat white and a few text colors, so an adaptive
+                # palette keeps them visually identical at a fraction of the size.
+                png_image = canvas.quantize(colors=encode.png_palette)
+            png_bytes = encode_image(
+                png_image, "PNG", stats=stats, **encode.png_params()
+            )
+        write(out_png_path, png_bytes)
+
+        for fmt, side_path in (out_side_paths or {}).items():
+            pil_format = SIDE_FORMATS[fmt][0]
+            with profiler.stage(f"{fmt}_encode", size):
+                side_bytes = encode_image(
+                    canvas,
+                    pil_format,
+                    stats=stats,
+                    stats_key=fmt,
+                    quality=encode.lossy_quality,
+                )
+            write(side_path, side_bytes)
+
+        if out_tiles_path is not None:
+            # Tiles go to `write` one by one, so the output threads write them in
+            # parallel while the next ones are encoded.
+            with profiler.stage("tiles", size):
+                for tile_path, tile_bytes in deep_zoom_tiles(
+                    canvas, out_tiles_path, encode, stats
+                ):
+                    write(tile_path, tile_bytes)
+
+    if not write_svg:
+        return
+
+    # --- SVG with same aligned Ys ---
+    with profiler.stage("svg_build", size):
+        svg_start = time.perf_counter()
+        b64_png = ""
+        img_href = None
+        banded_png = None
+        if banded:
+            start = time.perf_counter()
+            banded_png = encode_fitted_banded(
+                premultiplied, fitted_wh, band_rows, encode.png_compress_level, draft
+            )
+            if stats is not None and svg_mode != "inline":
+                stats.add("asset", len(banded_png), time.perf_counter() - start)
+        if svg_mode == "inline":
+            if banded_png is not None:
+                b64_png = base64.b64encode(banded_png).decode("ascii")
+            else:
+                b64_png = pil_to_base64_png(fitted, **encode.png_params())
+        else:
+            asset = banded_png
+            if asset is None:
+                asset = encode_image(
+                    fitted, "PNG", stats=stats, stats_key="asset", **encode.png_params()
+                )
+            asset_name = f"{hashlib.sha256(asset).hexdigest()[:16]}.png"
+            asset_path = out_svg_path.parent / SVG_ASSETS_DIR / asset_name
+            if not asset_path.exists():
+                write(asset_path, asset)
+            img_href = f"{SVG_ASSETS_DIR}/{asset_name}"
+        text_svg = None
+        if svg_text == "paths":
+            word_x = card_placement(
+                layout,
+                (img_w, img_h),
+                letters_text,
+                word_text,
+                letters_font,
+                word_font,
+            )[3]
+            text_svg = glyph_paths_svg(
+                [
+                    (
+                        letters_text,
+                        letters_font,
+                        (layout.letters_x, letters_draw_y),
+                        rgb_to_hex(letters_color_rgb),
+                    ),
+                    (
+                        word_text,
+                        word_font,
+                        (word_x, word_draw_y),
+                        rgb_to_hex(word_color_rgb),
+                    ),
+                ]
+            )
+        svg_doc = compose_svg(
+            canvas_w=layout.width,
+            canvas_h=layout.height,
+            letters_text=letters_text,
+            letters_fill=rgb_to_hex(letters_color_rgb),
+            word_text=word_text,
+            word_fill=rgb_to_hex(word_color_rgb),
+            word_font_family=svg_font_family,
+            letters_font_family=svg_font_family,
+            img_b64_png=b64_png,
+            img_x=img_x,
+            img_y=img_y,
+            img_w=img_w,
+            img_h=img_h,
+            letters_x=layout.letters_x,
+            letters_y=letters_draw_y,
+            word_center_x=int(layout.width / 2),
+            word_y=word_draw_y,
+            letters_font_px=letters_px,
+            word_font_px=word_px,
+            img_href=img_href,
+            text_svg=text_svg,
+        )
+
+        svg_bytes = svg_doc.encode("utf-8")
+        if stats is not None:
+            stats.add("svg", len(svg_bytes), time.perf_counter() - svg_start)
+    write(out_svg_path, svg_bytes)
+
+
+def render_card(
+    letter: str,
+    word: str,
+    illustration: Optional[Path],
+    targets: List[Dict[str, Any]],
+    letters_color_rgb: Tuple[int, int, int],
+    word_color_rgb: Tuple[int, int, int],
+    svg_font_family: str,
+    ttf_path: Optional[Path],
+    crop_cache_dir: Optional[Path] = None,
+    illustration_digest: Optional[str] = None,
+    draft: bool = False,
+    write_svg: bool = True,
+    encode: Optional[EncodeOptions] = None,
+    svg_mode: str = "inline",
+    svg_text: str = "text",
+    profile: bool = False,
+    memory_limit: Optional[int] = None,
+    source_data: Optional[bytes] = None,
+    crop_data: Optional[bytes] = None,
+    crop_bg_rgb: Tuple[int, int, int] = (255, 255, 255),
+    crop_tolerance: Tolerance = 10,
+    shared_illustration: Optional[Tuple[str, Tuple[int, int]]] = None,
+) -> Tuple[Optional[str], EncodeStats, List[Dict[str, Any]], List[Tuple[Path, bytes]]]:
+    """
+    Render the card for (letter, word) at every target size from one decode.
+    Each target is a dict with layout, out_dir, svg_dir, png_dir, letters_font_px
+    and word_font_px. source_data and crop_data are prefetched illustration bytes
+    (see prefetch_illustration); crop_bg_rgb and crop_tolerance tune the autocrop.
+    shared_illustration is an already cropped illustration in a
+    SharedIllustrationStore, mapped instead of decoding one. Returns (report line
+    if the card was skipped, encode stats, profiler events, encoded (path, bytes)
+    outputs still to be written). Runs in worker processes.
+    """
+    base = f"{letter} ({word})"
+    stats = EncodeStats()
+    profiler = Profiler(enabled=profile)
+    profiler.card = base
+    outputs: List[Tuple[Path, bytes]] = []
+
+    if illustration is None:
+        return (f"{base} — missing illustration for '{word}'", stats, [], outputs)
+
+    side_formats = encode.side_formats if encode is not None else ()
+
+    with contextlib.ExitStack() as stack:
+        if shared_illustration is not None:
+            with profiler.stage("map_shared"):
+                src_img = stack.enter_context(
+                    map_shared_illustration(*shared_illustration)
+                )
+        else:
+            src_img = load_illustration(
+                illustration,
+                crop_cache_dir=crop_cache_dir,
+                source_digest=illustration_digest,
+                draft_size=card_draft_size(targets, draft),
+                profiler=profiler,
+                memory_limit=memory_limit,
+                source_data=source_data,
+                crop_data=crop_data,
+                bg_rgb=crop_bg_rgb,
+                tolerance=crop_tolerance,
+            )
+        for target in targets:
+            build_flashcard_for_pair(
+                letter=letter,
+                word=word,
+                illustration_path=illustration,
+                out_svg_path=target["svg_dir"] / f"{base}.svg",
+                out_png_path=target["png_dir"] / f"{base}.png",
+                layout=target["layout"],
+                letters_color_rgb=letters_color_rgb,
+                word_color_rgb=word_color_rgb,
+                svg_font_family=svg_font_family,
+                ttf_path=ttf_path,
+                letters_font_override=target["letters_font_px"],
+                word_font_override=target["word_font_px"],
+                src_img=src_img,
+                draft=draft,
+                write_svg=write_svg,
+                encode=encode,
+                out_side_paths={
+                    fmt: target["out_dir"] / f"{fmt}s" / f"{base}{SIDE_FORMATS[fmt][1]}"
+                    for fmt in side_formats
+                },
+                out_tiles_path=(
+                    target["out_dir"] / TILES_DIR / f"{base}.dzi"
+                    if encode is not None and encode.tile_size
+                    else None
+                ),
+                stats=stats,
+                svg_mode=svg_mode,
+                svg_text=svg_text,
+                profiler=profiler,
+                memory_limit=memory_limit,
+                write=lambda path, data: outputs.append((path, data)),
+            )
+    return (None, stats, profiler.events, outputs)
+
+
+def card_draft_size(
+    targets: List[Dict[str, Any]], draft: Optional[bool]
+) -> Optional[Tuple[int, int]]:
+    """Size a --draft card's illustration may be decoded at (JPEG DCT scaling)."""
+    if not draft:
+        return None
+    return (
+        max(t["layout"].width for t in targets),
+        max(t["layout"].height for t in targets),
+    )
+
+
+def prefetch_illustration(
+    card: Dict[str, Any], store: Optional[SharedIllustrationStore] = None
+) -> Dict[str, Any]:
+    """
+    Read the bytes render_card(**card) will decode: the crop cache entry if there
+    is one, else the source illustration. Returns them as extra render_card
+    arguments, so slow (e.g. network) reads can run ahead of rendering. With a
+    store, the illustration is decoded and cropped into it instead, and the card
+    is given its entry to map.
+    """
+    illustration = card["illustration"]
+    if illustration is None:
+        return {}
+    if store is not None:
+        return {"shared_illustration": store.acquire(card)}
+    crop_cache_dir = card.get("crop_cache_dir")
+    digest = card.get("illustration_digest")
+    jpeg_draft = card.get("draft") and illustration.suffix.lower() in (".jpg", ".jpeg")
+    if crop_cache_dir is not None and digest is not None and not jpeg_draft:
+        try:
+            _key, cached_path = crop_cache_path(
+                crop_cache_dir,
+                digest,
+                card.get("crop_bg_rgb", (255, 255, 255)),
+                card.get("crop_tolerance", 10),
+            )
+            return {"crop_data": cached_path.read_bytes()}
+        except OSError:
+            pass
+    return {"source_data": illustration.read_bytes()}
+
+
+def iter_rendered(
+    card_kwargs: List[Dict[str, Any]],
+    jobs: int,
+    executor: Optional[ProcessPoolExecutor] = None,
+    io_threads: int = 4,
+    store: Optional[SharedIllustrationStore] = None,
+) -> Iterator[
+    Tuple[Optional[str], EncodeStats, List[Dict[str, Any]], List[Tuple[Path, bytes]]]
+]:
+    """
+    Yield render_card results in order, each as soon as it (and every card before
+    it) is done. Cards are independent, so with jobs > 1 they are spread over a
+    process pool (`executor` if given, else a new one); results still come back in
+    mapping order, so the report is the same for any --jobs value.
+
+    Illustrations are read by io_threads threads ahead of rendering (see
+    prefetch_illustration). At most 2 * jobs cards are submitted and as many again
+    prefetched at any time, so memory stays bounded however long the deck is.
+    With a store, the prefetch decodes and crops into it (see
+    SharedIllustrationStore), and each entry is released once its card is done.
+    """
+    window = 2 * jobs
+    with contextlib.ExitStack() as stack:
+        reader = stack.enter_context(ThreadPoolExecutor(max_workers=io_threads))
+        if jobs > 1 and executor is None:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=jobs))
+        pending = iter(card_kwargs)
+        reads: deque = deque()
+        renders: deque = deque()
+
+        def read_next() -> None:
+            card = next(pending, None)
+            if card is not None:
+                reads.append((card, reader.submit(prefetch_illustration, card, store)))
+
+        for _ in range(2 * window):
+            read_next()
+        while reads or renders:
+            while reads and len(renders) < window:
+                card, data = reads.popleft()
+                read_next()
+                card = {**card, **data.result()}
+                if jobs == 1:
+                    renders.append((card, None))
+                else:
+                    renders.append((card, executor.submit(render_card, **card)))
+            card, future = renders.popleft()
+            result = render_card(**card) if future is None else future.result()
+            if "shared_illustration" in card:
+                store.release(card["shared_illustration"][0])
+            yield result
+
+
+def deck_font_sizes(
+    pairs: List[Tuple[str, str]],
+    layout: Layout,
+    ttf_path: Optional[Path],
+    cached: Optional[List[int]],
+) -> Tuple[int, int]:
+    """
+    Return (letters_px, word_px) shared by every card of the deck at this layout.
+    `cached` is a previous result for the same texts, boxes and font, if any.
+    """
+    if cached is not None:
+        return (cached[0], cached[1])
+    letters_px = compute_min_letters_font_px(
+        pairs=pairs,
+        box_w=layout.letters_box_w,
+        box_h=layout.letters_box_h,
+        ttf_path=ttf_path,
+    )
+    word_px = compute_min_word_font_px(
+        pairs=pairs,
+        box_w=layout.word_box_w,
+        box_h=layout.word_box_h,
+        ttf_path=ttf_path,
+    )
+    return (letters_px, word_px)
+
+
+class BuildResources:
+    """
+    Caches and worker processes shared by every deck built in one process (see
+    scripts/batch_flashcards.py). Fonts and text layouts are already cached
+    process-wide; this adds illustration directory indexes, file digests and one
+    process pool whose workers keep their font, layout and crop caches from deck
+    to deck, and one SharedIllustrationStore (with --shared_store_mb).
+    """
+
+    def __init__(self, jobs: int) -> None:
+        self.jobs = jobs
+        self.known_files: Dict[str, Dict[str, Any]] = {}
+        self._indexes: Dict[Path, IllustrationIndex] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._store: Optional[SharedIllustrationStore] = None
+
+    def index(self, images_dir: Path) -> IllustrationIndex:
+        key = images_dir.resolve()
+        if key not in self._indexes:
+            self._indexes[key] = IllustrationIndex(images_dir)
+        return self._indexes[key]
+
+    def forget_index(self, images_dir: Path) -> None:
+        """Rescan images_dir on the next index() call, after files were added or removed."""
+        self._indexes.pop(images_dir.resolve(), None)
+
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.jobs)
+        return self._executor
+
+    def illustration_store(self, max_bytes: int) -> SharedIllustrationStore:
+        if self._store is None:
+            self._store = SharedIllustrationStore(max_bytes)
+        self._store.max_bytes = max_bytes
+        return self._store
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+# ----------------------------------
+# CLI
+# ----------------------------------
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Compose SVG + PNG flashcards from illustration images."
     )
@@ -511,6 +3053,21 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--height", type=int, default=2500, help="Flashcard height in pixels."
     )
+    parser.add_argument(
+        "--preset",
+        nargs="+",
+        choices=sorted(PRESETS),
+        default=[],
+        help="Render the deck at these named sizes, each into OUT/<preset>/ (replaces --width/--height).",
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=parse_size,
+        default=[],
+        metavar="WxH",
+        help="Render the deck at these sizes, each into OUT/<W>x<H>/ (replaces --width/--height).",
+    )
     parser.add_argument(
         "--font", type=Path, default=None, help="Optional path to a TrueType font file."
     )
@@ -532,6 +3089,22 @@ def parse_args() -> argparse.Namespace:
         default="Andika",
         help="SVG font-family fallback chain.",
     )
+    parser.add_argument(
+        "--crop_background",
+        type=str,
+        default="#FFFFFF",
+        help="Hex background color trimmed from illustration borders (default: white).",
+    )
+    parser.add_argument(
+        "--crop_tolerance",
+        type=parse_tolerance,
+        default=10,
+        metavar="N|R,G,B",
+        help=(
+            "How far from the background a border pixel may be and still be trimmed: "
+            "one grayscale value, or one per channel (default: 10)."
+        ),
+    )
     parser.add_argument(
         "--letters_font_size",
         type=int,
@@ -541,7 +3114,246 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--word_font_size", type=int, default=None, help="Override font size for word."
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--svg_mode",
+        choices=SVG_MODES,
+        default="inline",
+        help=(
+            "inline: embed the illustration as base64 (default); external: reference "
+            "a shared PNG in svgs/assets/; sprite: external, plus one "
+            f"{SPRITE_NAME} with every card as a <symbol>."
+        ),
+    )
+    parser.add_argument(
+        "--svg_text",
+        choices=SVG_TEXT_MODES,
+        default="text",
+        help=(
+            "text: <text> elements in --svg_font_family (default); paths: glyph "
+            "outlines from the TrueType font, so SVGs look the same without it "
+            "installed (needs fontTools)."
+        ),
+    )
+    parser.add_argument(
+        "--draft",
+        action="store_true",
+        help="Fast preview: cheaper resampling, fast PNG compression and no SVGs.",
+    )
+    parser.add_argument(
+        "--no_svg", action="store_true", help="Only write PNGs, skip SVG output."
+    )
+    parser.add_argument(
+        "--png_compress_level",
+        type=int,
+        choices=range(10),
+        default=None,
+        metavar="0-9",
+        help="zlib level for PNG output (default: Pillow's default; 1 with --draft).",
+    )
+    parser.add_argument(
+        "--png_optimize",
+        action="store_true",
+        help="Let Pillow search for the smallest PNG encoding (slower).",
+    )
+    parser.add_argument(
+        "--png_palette",
+        type=int,
+        default=0,
+        metavar="COLORS",
+        help="Quantize card PNGs to an adaptive palette of this many colors (2-256).",
+    )
+    parser.add_argument(
+        "--side_formats",
+        nargs="+",
+        choices=sorted(SIDE_FORMATS),
+        default=[],
+        help="Also write each card in these formats (into OUT/webps/, OUT/avifs/).",
+    )
+    parser.add_argument(
+        "--lossy_quality",
+        type=int,
+        default=90,
+        help="Quality for WebP/AVIF side outputs (default: 90).",
+    )
+    parser.add_argument(
+        "--tiles",
+        action="store_true",
+        help=(
+            f"Also write each card as a deep zoom tile pyramid for web viewers "
+            f"(OUT/{TILES_DIR}/<card>.dzi and OUT/{TILES_DIR}/<card>_files/)."
+        ),
+    )
+    parser.add_argument(
+        "--tile_size",
+        type=int,
+        default=256,
+        help="Edge of the --tiles tiles in pixels (default: 256).",
+    )
+    parser.add_argument(
+        "--tile_format",
+        choices=sorted(TILE_FORMATS),
+        default="png",
+        help="Image format of the --tiles tiles (default: png).",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes used to render cards (default: CPU count).",
+    )
+    parser.add_argument(
+        "--io_threads",
+        type=int,
+        default=4,
+        help=(
+            "Threads that read illustrations ahead of rendering and write finished "
+            "files in the background (default: 4)."
+        ),
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every card even if the build manifest says it is up to date.",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=Path,
+        default=None,
+        help="Directory for cached autocropped illustrations (default: OUT/.cache).",
+    )
+    parser.add_argument(
+        "--max_memory_mb",
+        type=int,
+        default=None,
+        metavar="MB",
+        help=(
+            "Memory ceiling for rendering, shared by all workers. Cards that would "
+            "exceed their share are cropped, composed and encoded in bands."
+        ),
+    )
+    parser.add_argument(
+        "--shared_store_mb",
+        type=int,
+        default=None,
+        metavar="MB",
+        help=(
+            "Decode and crop each illustration once into shared memory for the "
+            "workers to map, instead of every worker holding its own copy; "
+            "illustrations up to MB are kept for reuse (needs --jobs > 1)."
+        ),
+    )
+    parser.add_argument(
+        "--sheet",
+        choices=sorted(PAPER_SIZES),
+        default=None,
+        help=(
+            f"Also impose the cards N-up onto printable sheets with cut marks "
+            f"(OUT/{SHEETS_PDF} and OUT/{SHEETS_DIR}/sheet-NN.png)."
+        ),
+    )
+    parser.add_argument(
+        "--sheet_grid",
+        type=parse_size,
+        default=(2, 2),
+        metavar="COLSxROWS",
+        help="Cards per sheet (default: 2x2, 3x5 in cards on Letter).",
+    )
+    parser.add_argument(
+        "--sheet_dpi",
+        type=int,
+        default=300,
+        help="Resolution of the imposed sheets (default: 300).",
+    )
+    parser.add_argument(
+        "--package",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help=(
+            "Also stream the cards into reproducible archives in DIR "
+            "(flashcards_svgs.zip, flashcards_pngs.zip, ...) while they are built."
+        ),
+    )
+    parser.add_argument(
+        "--package_formats",
+        nargs="+",
+        choices=ARCHIVE_FORMATS,
+        default=["zip"],
+        help="Archive formats for --package (default: zip; tar.zst needs zstandard).",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "Stay running and rebuild whenever an illustration, the mapping or the "
+            "font changes, re-rendering only the affected cards."
+        ),
+    )
+    parser.add_argument(
+        "--watch_interval",
+        type=float,
+        default=0.5,
+        metavar="SECONDS",
+        help="How often --watch polls for changes (default: 0.5).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print wall/CPU time and peak memory per pipeline stage.",
+    )
+    parser.add_argument(
+        "--stats_json",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="Write every per-card stage measurement to this JSON file.",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="Write stage timings as a Chrome trace (open in chrome://tracing or Perfetto).",
+    )
+    parser.add_argument(
+        "--cprofile",
+        type=Path,
+        default=None,
+        metavar="PATH",
+        help="Render in-process under cProfile and dump the stats here (implies --jobs 1).",
+    )
+    args = parser.parse_args(argv)
+    if args.io_threads < 1:
+        parser.error("--io_threads must be at least 1")
+    if args.shared_store_mb is not None and args.shared_store_mb < 0:
+        parser.error("--shared_store_mb cannot be negative")
+    if args.watch_interval <= 0:
+        parser.error("--watch_interval must be positive")
+    if args.png_palette and not 2 <= args.png_palette <= 256:
+        parser.error("--png_palette must be between 2 and 256")
+    if args.max_memory_mb is not None and (
+        args.png_palette or args.side_formats or args.tiles
+    ):
+        parser.error(
+            "--max_memory_mb cannot be combined with --png_palette, --side_formats "
+            "or --tiles"
+        )
+    if args.tile_size < 16:
+        parser.error("--tile_size must be at least 16")
+    if args.tiles and not features.check(TILE_FORMATS[args.tile_format][2]):
+        parser.error(f"this Pillow build cannot write {args.tile_format.upper()} files")
+    for fmt in args.side_formats:
+        if not features.check(fmt):
+            parser.error(f"this Pillow build cannot write {fmt.upper()} files")
+    if args.svg_text == "paths":
+        if TTFont is None:
+            parser.error("--svg_text paths needs the fontTools module")
+        if resolve_font_path(args.font) is None:
+            parser.error("--svg_text paths needs a TrueType font (--font)")
+    tar_zst = args.package is not None and "tar.zst" in args.package_formats
+    if tar_zst and zstandard is None:
+        parser.error("tar.zst archives need the zstandard module")
+    return args
 
 
 # ----------------------------------
@@ -549,66 +3361,415 @@ def parse_args() -> argparse.Namespace:
 # ----------------------------------
 
 
-def main() -> None:
-    args = parse_args()
-
+def build_deck(
+    args: argparse.Namespace, shared: Optional[BuildResources] = None
+) -> Dict[str, Any]:
+    """
+    Build one deck as described by parsed command-line arguments and print its
+    report. With `shared`, illustration indexes, file digests and worker processes
+    come from (and stay in) it, and its --jobs replaces the deck's own.
+    Returns a summary for combined reports.
+    """
+    start = time.perf_counter()
     pairs = load_mapping(args.mapping)
-    svg_dir, png_dir = ensure_out_dirs(args.out)
 
-    # Canvas dimensions are used only for illustration fitting/placement; text auto-fit uses boxes.
-    layout = Layout(width=args.width, height=args.height)
+    # One (name, layout, output dir) per requested size. Without --preset/--sizes the
+    # deck is written straight into OUT/ at --width x --height, as before.
+    sizes = [(name, PRESETS[name]) for name in args.preset]
+    sizes += [(f"{w}x{h}", (w, h)) for w, h in args.sizes]
+    if sizes:
+        targets_spec = [(name, Layout(w, h), args.out / name) for name, (w, h) in sizes]
+    else:
+        # Canvas dimensions are used only for illustration fitting/placement; text auto-fit uses boxes.
+        targets_spec = [("", Layout(width=args.width, height=args.height), args.out)]
+
     ttf_path = resolve_font_path(args.font)
 
     letters_color_rgb = hex_to_rgb(args.letter_color)
     word_color_rgb = hex_to_rgb(args.word_color)
+    crop_bg_rgb = hex_to_rgb(args.crop_background)
 
-    # Use a consistent letters font size across all cards unless user overrides it.
-    computed_letters_px: Optional[int] = None
-    if args.letters_font_size is None:
-        computed_letters_px = compute_min_letters_font_px(
-            pairs=pairs,
-            box_w=layout.letters_box_w,
-            box_h=layout.letters_box_h,
-            ttf_path=ttf_path,
-        )
+    profiler = Profiler(
+        enabled=bool(args.profile or args.stats_json or args.trace or args.cprofile)
+    )
 
-    # Use a consistent word font size across all cards unless user overrides it.
-    computed_word_px: Optional[int] = None
-    if args.word_font_size is None:
-        computed_word_px = compute_min_word_font_px(
-            pairs=pairs,
-            box_w=layout.word_box_w,
-            box_h=layout.word_box_h,
-            ttf_path=ttf_path,
+    manifest = BuildManifest(
+        args.out, known_files=shared.known_files if shared is not None else None
+    )
+    font_digest = manifest.file_digest(ttf_path) if ttf_path is not None else None
+    renderer_digest = manifest.file_digest(Path(__file__))
+
+    # Use consistent letters and word font sizes across all cards of a layout unless
+    # the user overrides them. The pre-pass only depends on the texts, the boxes and
+    # the font, so it runs once per layout and its result is remembered in the
+    # manifest until one of those changes.
+    targets: List[Dict[str, Any]] = []
+    font_sizes: Dict[str, List[int]] = {}
+    for name, layout, target_out in targets_spec:
+        svg_dir, png_dir = ensure_out_dirs(target_out)
+        letters_font_px = args.letters_font_size
+        word_font_px = args.word_font_size
+        if letters_font_px is None or word_font_px is None:
+            prepass_key = digest_json(
+                {
+                    "pairs": pairs,
+                    "letters_box": [layout.letters_box_w, layout.letters_box_h],
+                    "word_box": [layout.word_box_w, layout.word_box_h],
+                    "font": font_digest,
+                }
+            )
+            cached = None if args.force else manifest.font_sizes.get(prepass_key)
+            with profiler.stage("font_prepass", f"{layout.width}x{layout.height}"):
+                computed = deck_font_sizes(pairs, layout, ttf_path, cached)
+            font_sizes[prepass_key] = list(computed)
+            letters_font_px = letters_font_px or computed[0]
+            word_font_px = word_font_px or computed[1]
+        targets.append(
+            {
+                "name": name,
+                "layout": layout,
+                "out_dir": target_out,
+                "svg_dir": svg_dir,
+                "png_dir": png_dir,
+                "letters_font_px": letters_font_px,
+                "word_font_px": word_font_px,
+            }
         )
+    manifest.font_sizes = font_sizes
+
+    write_svg = not (args.draft or args.no_svg)
+    png_compress_level = args.png_compress_level
+    if png_compress_level is None and args.draft:
+        png_compress_level = 1
+    encode = EncodeOptions(
+        png_compress_level=png_compress_level,
+        png_optimize=args.png_optimize,
+        png_palette=args.png_palette,
+        side_formats=args.side_formats,
+        lossy_quality=args.lossy_quality,
+        tile_size=args.tile_size if args.tiles else 0,
+        tile_format=args.tile_format,
+    )
 
-    missing: List[str] = []
+    cache_dir = args.cache_dir if args.cache_dir is not None else args.out / ".cache"
+    crop_cache_dir = cache_dir / "crops"
 
+    if shared is not None:
+        index = shared.index(args.images)
+    else:
+        index = IllustrationIndex(args.images)
+    ambiguous = index.ambiguity_reports(word for _, word in pairs)
+    if ambiguous:
+        print("Some words match more than one illustration:")
+        for line in ambiguous:
+            print(" -", line)
+
+    card_kwargs = []
+    card_keys: Dict[str, Tuple[str, List[Path]]] = {}
+    card_names: List[str] = []
+    card_files: Dict[str, List[Path]] = {}
+    output_keys: Dict[Path, str] = {}
+    up_to_date = 0
     for letter, word in pairs:
-        illustration = find_illustration(args.images, word)
+        illustration = index.find(word)
+        illustration_digest = None
         base = f"{letter} ({word})"
-        out_svg = svg_dir / f"{base}.svg"
-        out_png = png_dir / f"{base}.png"
-
-        if illustration is None:
-            missing.append(f"{base} — missing illustration for '{word}'")
-            continue
+        stale_targets = targets
+
+        if illustration is not None:
+            illustration_digest = manifest.file_digest(illustration)
+            stale_targets = []
+            for target in targets:
+                name = f"{target['name']}/{base}" if target["name"] else base
+                card_names.append(name)
+                outputs = [target["png_dir"] / f"{base}.png"]
+                if write_svg:
+                    outputs.append(target["svg_dir"] / f"{base}.svg")
+                outputs += [
+                    target["out_dir"] / f"{fmt}s" / f"{base}{SIDE_FORMATS[fmt][1]}"
+                    for fmt in encode.side_formats
+                ]
+                if encode.tile_size:
+                    outputs.append(target["out_dir"] / TILES_DIR / f"{base}.dzi")
+                key = digest_json(
+                    {
+                        "renderer": renderer_digest,
+                        "illustration": illustration_digest,
+                        "letter": letter,
+                        "word": word,
+                        "size": [target["layout"].width, target["layout"].height],
+                        "colors": [letters_color_rgb, word_color_rgb],
+                        "crop": [crop_bg_rgb, args.crop_tolerance],
+                        "svg_font_family": args.svg_font_family,
+                        "font": font_digest,
+                        "font_px": [target["letters_font_px"], target["word_font_px"]],
+                        "draft": args.draft,
+                        "svg": write_svg,
+                        "svg_mode": args.svg_mode,
+                        "svg_text": args.svg_text,
+                        "encode": encode.describe(),
+                        "max_memory": (
+                            [args.max_memory_mb, args.jobs]
+                            if args.max_memory_mb is not None
+                            else None
+                        ),
+                    }
+                )
+                card_files.setdefault(base, []).extend(outputs)
+                output_keys.update((path, key) for path in outputs)
+                if not args.force and manifest.is_current(name, key, outputs):
+                    up_to_date += 1
+                    continue
+                card_keys[name] = (key, outputs)
+                stale_targets.append(target)
+            if not stale_targets:
+                continue
+
+        card_kwargs.append(
+            {
+                "letter": letter,
+                "word": word,
+                "illustration": illustration,
+                "targets": stale_targets,
+                "letters_color_rgb": letters_color_rgb,
+                "word_color_rgb": word_color_rgb,
+                "svg_font_family": args.svg_font_family,
+                "ttf_path": ttf_path,
+                "crop_cache_dir": crop_cache_dir,
+                "illustration_digest": illustration_digest,
+                "draft": args.draft,
+                "write_svg": write_svg,
+                "encode": encode,
+                "svg_mode": args.svg_mode,
+                "svg_text": args.svg_text,
+                "profile": profiler.enabled,
+                "crop_bg_rgb": crop_bg_rgb,
+                "crop_tolerance": args.crop_tolerance,
+            }
+        )
 
-        build_flashcard_for_pair(
-            letter=letter,
-            word=word,
-            illustration_path=illustration,
-            out_svg_path=out_svg,
-            out_png_path=out_png,
-            layout=layout,
-            letters_color_rgb=letters_color_rgb,
-            word_color_rgb=word_color_rgb,
-            svg_font_family=args.svg_font_family,
-            ttf_path=ttf_path,
-            letters_font_override=args.letters_font_size or computed_letters_px,
-            word_font_override=args.word_font_size or computed_word_px,
+    jobs = shared.jobs if shared is not None else args.jobs
+    jobs = max(1, min(jobs, len(card_kwargs)))
+    if args.cprofile is not None and jobs > 1:
+        # cProfile only sees the calling process, so keep every card in it.
+        print("--cprofile renders in a single process; ignoring --jobs.")
+        jobs = 1
+    if args.max_memory_mb is not None:
+        # Every worker may be rendering a card at the same time.
+        for kwargs in card_kwargs:
+            kwargs["memory_limit"] = args.max_memory_mb * 1024 * 1024 // jobs
+
+    stats = EncodeStats()
+
+    # With --sheet, one set of sheets per size. Its key covers every card imposed
+    # onto it and the sheet settings, so the sheets are only imposed and encoded
+    # again when one of those changed.
+    imposers: List[Tuple[Dict[str, Any], SheetImposer, str]] = []
+    if args.sheet is not None:
+        for target in targets:
+            cards = []
+            for letter, word in pairs:
+                png_path = target["png_dir"] / f"{letter} ({word}).png"
+                if png_path in output_keys:
+                    cards.append([png_path.name, output_keys[png_path]])
+                elif png_path.exists():
+                    # A card without an illustration, left over from a build.
+                    cards.append([png_path.name, manifest.file_digest(png_path)])
+            key = digest_json(
+                {
+                    "cards": cards,
+                    "sheet": [args.sheet, args.sheet_grid, args.sheet_dpi],
+                    "encode": encode.describe(),
+                }
+            )
+            pdf_path = target["out_dir"] / SHEETS_PDF
+            entry = manifest.sheets.get(str(pdf_path.resolve()), {})
+            sheet_dir = target["out_dir"] / SHEETS_DIR
+            pages = range(1, entry.get("pages", 0) + 1)
+            outputs = [pdf_path, *(sheet_path(sheet_dir, n) for n in pages)]
+            if (
+                not args.force
+                and entry.get("key") == key
+                and all(path.exists() for path in outputs)
+            ):
+                print(f"{pdf_path} already up to date.")
+                continue
+            imposer = SheetImposer(
+                target["out_dir"],
+                target["layout"],
+                paper=args.sheet,
+                grid=args.sheet_grid,
+                dpi=args.sheet_dpi,
+                encode=encode,
+                stats=stats,
+            )
+            imposers.append((target, imposer, key))
+
+    # With --package, one archive per format and output directory of every size.
+    # Its key covers the key of every card in it, so an archive is only rewritten
+    # when one of its cards changed.
+    packages: List[Tuple[DeckPackager, str]] = []
+    package_entries: Dict[Path, List[DeckPackager]] = {}
+    if args.package is not None:
+        mtime = archive_mtime()
+        for target in targets:
+            folders = [("pngs", target["png_dir"])]
+            if write_svg:
+                folders.insert(0, ("svgs", target["svg_dir"]))
+            folders += [
+                (f"{fmt}s", target["out_dir"] / f"{fmt}s")
+                for fmt in encode.side_formats
+            ]
+            prefix = (
+                f"flashcards_{target['name']}_" if target["name"] else "flashcards_"
+            )
+            for label, folder in folders:
+                files = sorted(path for path in output_keys if path.parent == folder)
+                key = digest_json(
+                    {
+                        "files": [[path.name, output_keys[path]] for path in files],
+                        "mtime": mtime,
+                    }
+                )
+                for fmt in args.package_formats:
+                    archive_path = args.package / f"{prefix}{label}.{fmt}"
+                    if (
+                        not args.force
+                        and manifest.packages.get(str(archive_path.resolve())) == key
+                        and archive_path.exists()
+                    ):
+                        print(f"{archive_path} already up to date.")
+                        continue
+                    packager = DeckPackager(
+                        archive_path, fmt, folder, [path.name for path in files], mtime
+                    )
+                    packages.append((packager, key))
+                    for path in files:
+                        package_entries.setdefault(path, []).append(packager)
+
+    # Walk the deck in mapping order, taking each rendered card as it arrives, so
+    # sheets are filled while later cards are still rendering. Illustrations are
+    # read ahead of the workers and their encoded files are written by background
+    # threads, so reads, rendering and writes overlap. Freshly rendered cards are
+    # imposed from their encoded bytes, up-to-date ones from their existing PNGs,
+    # and both are streamed into the --package archives the same way. The writer
+    # is closed before the archives, which read shared SVG assets from disk.
+    reports: List[Tuple[Optional[str], EncodeStats, List[Dict[str, Any]]]] = []
+    executor = shared.executor() if shared is not None and jobs > 1 else None
+    scope = contextlib.ExitStack()
+    store: Optional[SharedIllustrationStore] = None
+    if args.shared_store_mb is not None and jobs > 1:
+        store_bytes = args.shared_store_mb * 1024 * 1024
+        if shared is not None:
+            store = shared.illustration_store(store_bytes)
+        else:
+            store = scope.enter_context(SharedIllustrationStore(store_bytes))
+    rendered = iter_rendered(
+        card_kwargs, jobs, executor, io_threads=args.io_threads, store=store
+    )
+    render_order = [(kwargs["letter"], kwargs["word"]) for kwargs in card_kwargs]
+    cprofiler = cProfile.Profile() if args.cprofile is not None else None
+    writer = OutputWriter(
+        threads=args.io_threads,
+        max_pending=4 * args.io_threads,
+        profile=profiler.enabled,
+    )
+    for packager, _ in packages:
+        scope.enter_context(packager)
+    for _, imposer, _ in imposers:
+        scope.enter_context(imposer)
+    with cprofiler or contextlib.nullcontext(), scope, writer:
+        for letter, word in pairs:
+            fresh: Dict[Path, bytes] = {}
+            if render_order[len(reports) : len(reports) + 1] == [(letter, word)]:
+                report, card_stats, events, outputs = next(rendered)
+                reports.append((report, card_stats, events))
+                if report is not None:
+                    continue
+                for path, data in outputs:
+                    writer.write(path, data)
+                fresh = dict(outputs)
+            base = f"{letter} ({word})"
+            for path in card_files.get(base, []):
+                for packager in package_entries.get(path, []):
+                    with profiler.stage("package"):
+                        packager.add(path.name, path, fresh.get(path))
+            for target, imposer, _ in imposers:
+                png_path = target["png_dir"] / f"{base}.png"
+                if png_path in fresh:
+                    source: Any = io.BytesIO(fresh[png_path])
+                elif png_path.exists():
+                    source = png_path
+                else:
+                    continue
+                layout = target["layout"]
+                size = f"{layout.width}x{layout.height}"
+                with profiler.stage("impose", size), Image.open(source) as card:
+                    imposer.add(card)
+    profiler.events.extend(writer.events)
+    if cprofiler is not None:
+        cprofiler.dump_stats(args.cprofile)
+
+    if write_svg and args.svg_mode == "sprite":
+        # Assembled from the card files on disk so cards skipped as up to date
+        # are included too.
+        for target in targets:
+            cards = []
+            for letter, word in pairs:
+                svg_path = target["svg_dir"] / f"{letter} ({word}).svg"
+                if svg_path.exists():
+                    cards.append(
+                        (f"card-{letter}", svg_path.read_text(encoding="utf-8"))
+                    )
+            sprite = compose_sprite_svg(cards, href_prefix=f"{target['svg_dir'].name}/")
+            write_bytes(target["out_dir"] / SPRITE_NAME, sprite.encode("utf-8"))
+
+    for base, (key, outputs) in card_keys.items():
+        manifest.record(base, key, outputs)
+    for packager, key in packages:
+        manifest.packages[str(packager.archive.path.resolve())] = key
+    for _, imposer, key in imposers:
+        pdf_path = str(imposer.pdf.path.resolve())
+        manifest.sheets[pdf_path] = {"key": key, "pages": imposer.pages}
+    manifest.retain(card_names)
+    manifest.save()
+
+    for _, card_stats, events in reports:
+        stats.merge(card_stats)
+        profiler.events.extend(events)
+    missing: List[str] = [line for line, _, _ in reports if line is not None]
+
+    if stats.formats:
+        print("Encoded output:")
+        for line in stats.summary_lines():
+            print(" ", line)
+
+    if args.profile and profiler.events:
+        print("Pipeline stages:")
+        for line in profile_summary_lines(profiler.events):
+            print(" ", line)
+    if args.stats_json is not None:
+        stats_doc = {"jobs": jobs, "events": profiler.events}
+        write_bytes(args.stats_json, json.dumps(stats_doc, indent=2).encode("utf-8"))
+    if args.trace is not None:
+        trace = chrome_trace(profiler.events)
+        write_bytes(args.trace, json.dumps(trace).encode("utf-8"))
+    if args.cprofile is not None:
+        print(f"cProfile stats written to {args.cprofile} (python -m pstats).")
+
+    for _, imposer, _ in imposers:
+        print(f"Imposed {imposer.pages} sheet(s) into {imposer.pdf.path}")
+
+    for packager, _ in packages:
+        archive = packager.archive
+        size_mb = archive.path.stat().st_size / 1e6
+        print(
+            f"Packaged {archive.entries} file(s) into {archive.path} ({size_mb:.1f} MB)"
         )
 
+    if up_to_date:
+        print(f"{up_to_date} flashcard(s) already up to date.")
+
     if missing:
         print("\nSome flashcards were skipped due to missing illustrations:")
         for line in missing:
@@ -616,6 +3777,116 @@ def main() -> None:
     else:
         print("✅ All flashcards generated successfully.")
 
+    return {
+        "out": str(args.out),
+        "cards": len(pairs),
+        "rendered": len(card_kwargs) - len(missing),
+        "up_to_date": up_to_date,
+        "missing": missing,
+        "stats": stats,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+# ----------------------------------
+# Watch mode
+# ----------------------------------
+
+
+def watch_snapshot(
+    files: Iterable[Optional[Path]], dirs: Iterable[Path]
+) -> Dict[str, Tuple[int, int]]:
+    """(mtime_ns, size) of the given files and of the files directly in dirs."""
+    snapshot: Dict[str, Tuple[int, int]] = {}
+    for path in files:
+        if path is None:
+            continue
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        snapshot[str(path)] = (st.st_mtime_ns, st.st_size)
+    for folder in dirs:
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        st = entry.stat()
+                        snapshot[entry.path] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            continue
+    return snapshot
+
+
+def watch_deck(args: argparse.Namespace) -> None:
+    """
+    Build the deck, then poll the illustrations directory, the mapping and the font
+    every --watch_interval seconds and rebuild after each change, until interrupted.
+
+    Rebuilds run in this process with everything kept warm: the worker pool with
+    its font and crop caches, the file digests and the illustration index. The
+    build manifest then limits each rebuild to the cards whose inputs changed, and
+    the font pre-pass reruns only when its key (the mapping texts or the font)
+    does. A change is only picked up once the files have stopped changing for one
+    interval, so half-saved artwork is not rendered. A failed build is reported
+    and the watch goes on.
+    """
+    with BuildResources(jobs=max(1, args.jobs)) as shared:
+
+        def watched() -> Tuple[Optional[Path], Dict[str, Tuple[int, int]]]:
+            font = resolve_font_path(args.font)
+            return font, watch_snapshot([args.mapping, font], [args.images])
+
+        font, snapshot = watched()
+        try:
+            while True:
+                try:
+                    build_deck(args, shared)
+                except (OSError, ValueError) as e:
+                    # E.g. a mapping being edited or an unreadable illustration
+                    # (UnidentifiedImageError is an OSError); other errors are bugs.
+                    print(f"Build failed: {e}")
+                print(
+                    f"Watching {args.images}, {args.mapping} and the font "
+                    "(Ctrl+C to stop)."
+                )
+                new_font, current = font, snapshot
+                while current == snapshot and new_font == font:
+                    time.sleep(args.watch_interval)
+                    new_font, current = watched()
+                while True:
+                    time.sleep(args.watch_interval)
+                    new_font, settled = watched()
+                    if settled == current:
+                        break
+                    current = settled
+
+                changed = sorted(
+                    name
+                    for name in current.keys() | snapshot.keys()
+                    if current.get(name) != snapshot.get(name)
+                )
+                print(f"\nChanged: {', '.join(Path(name).name for name in changed)}")
+                if current.keys() != snapshot.keys():
+                    shared.forget_index(args.images)
+                font_path = str(font) if font is not None else None
+                if new_font != font or font_path in changed:
+                    # Cached fonts and text layouts are keyed by path, so drop them
+                    # here and restart the workers, which hold their own.
+                    clear_font_cache()
+                    shared.close()
+                font, snapshot = new_font, current
+        except KeyboardInterrupt:
+            print()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.watch:
+        watch_deck(args)
+    else:
+        build_deck(args)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Golden-image regression check for the rendered cards.
+
+Renders every card of the deck in memory, with the same steps as
+compose_flashcards_from_png.py (decode, autocrop, fit, deck font pre-pass, glyph
+alignment and compose), and compares it with a stored golden render:
+- the SHA-256 of the raw canvas pixels is compared first, so unchanged cards
+  cost one hash and nothing is decoded from the golden files;
+- only when the digests differ is the golden PNG loaded and diffed pixel by pixel
+  (Pillow's vectorized ImageChops), and the card passes if no channel differs by
+  more than --tolerance on more than --max_pixels pixels;
+- every failing card gets a heatmap in --diff_dir: the golden card dimmed to
+  gray, with differing pixels in red, brighter the larger the difference.
+
+Nothing is written during a check except the heatmaps, and the crop cache is not
+used, so changes to autocrop are checked too. --update renders the deck and
+stores it as the new golden set (GOLDEN/golden.json plus one PNG per card) for
+the --sizes of the run; golden renders of other sizes are kept.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from PIL import Image, ImageChops
+
+from compose_flashcards_from_png import (
+    IllustrationIndex,
+    Layout,
+    card_fonts,
+    deck_font_sizes,
+    fit_image,
+    hex_to_rgb,
+    image_area_size,
+    load_illustration,
+    load_mapping,
+    parse_size,
+    parse_tolerance,
+    render_canvas,
+    resolve_font_path,
+)
+
+GOLDEN_NAME = "golden.json"
+GOLDEN_VERSION = 1
+
+# ----------------------------------
+# Helpers
+# ----------------------------------
+
+
+def pixel_digest(img: Image.Image) -> str:
+    """SHA-256 of an image's mode, size and raw pixels (independent of PNG encoding)."""
+    sha = hashlib.sha256(f"{img.mode} {img.width}x{img.height}\n".encode("ascii"))
+    sha.update(img.tobytes())
+    return sha.hexdigest()
+
+
+def diff_images(
+    golden: Image.Image, current: Image.Image, tolerance: int
+) -> Tuple[int, int, Image.Image]:
+    """
+    Compare two RGB images of the same size. Returns (largest channel difference,
+    number of pixels differing by more than tolerance, heatmap).
+    """
+    delta = ImageChops.difference(golden, current)
+    r, g, b = delta.split()
+    delta = ImageChops.lighter(ImageChops.lighter(r, g), b)
+    largest = delta.getextrema()[1]
+    over = sum(delta.histogram()[tolerance + 1 :])
+
+    base = golden.convert("L").point(lambda v: 64 + v // 4)
+    hot = delta.point(lambda v: 0 if v <= tolerance else min(255, 96 + 4 * v))
+    mask = hot.point(lambda v: 255 if v else 0)
+    heat = Image.merge("RGB", (base, base, base))
+    heat.paste(Image.merge("RGB", (hot, Image.new("L", hot.size), base)), mask=mask)
+    return (largest, over, heat)
+
+
+# ----------------------------------
+# Rendering and comparison
+# ----------------------------------
+
+
+def check_card(task: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Render one card at every size and compare (or, with update, store) it.
+    Runs in worker processes; returns one result per size.
+    """
+    letter, word = task["letter"], task["word"]
+    base = f"{letter} ({word})"
+    golden_dir: Path = task["golden_dir"]
+    src_img = load_illustration(
+        task["illustration"],
+        bg_rgb=task["crop_bg_rgb"],
+        tolerance=task["crop_tolerance"],
+    )
+    letters_text = f"{letter} {letter.lower()}"
+
+    results = []
+    for size_name, (w, h), (letters_px, word_px) in task["sizes"]:
+        layout = Layout(w, h)
+        max_w, max_h = image_area_size(layout)
+        fitted = fit_image(src_img, max_w=max_w, max_h=max_h)
+        letters_font, _, word_font, _ = card_fonts(
+            letters_text, word, layout, task["ttf_path"], letters_px, word_px
+        )
+        canvas, placement = render_canvas(
+            letters_text=letters_text,
+            word_text=word,
+            fitted=fitted,
+            layout=layout,
+            letters_font=letters_font,
+            word_font=word_font,
+            letters_color_rgb=task["letters_color_rgb"],
+            word_color_rgb=task["word_color_rgb"],
+        )
+        name = f"{size_name}/{base}"
+        result: Dict[str, Any] = {
+            "card": name,
+            "sha256": pixel_digest(canvas),
+            "size": [w, h],
+            "font_px": [letters_px, word_px],
+            "placement": list(placement),
+        }
+        golden_png = golden_dir / size_name / f"{base}.png"
+
+        if task["update"]:
+            golden_png.parent.mkdir(parents=True, exist_ok=True)
+            canvas.save(golden_png, format="PNG", compress_level=1)
+            result["status"] = "updated"
+        else:
+            expected = task["golden"].get(name)
+            if expected is None:
+                result["status"] = "new"
+            elif expected["sha256"] == result["sha256"]:
+                result["status"] = "identical"
+            else:
+                result.update(
+                    compare_with_golden(
+                        canvas, golden_png, task, Path(size_name) / f"{base}.png"
+                    )
+                )
+                if expected.get("placement") != result["placement"]:
+                    result["moved"] = expected.get("placement")
+        results.append(result)
+    return results
+
+
+def compare_with_golden(
+    canvas: Image.Image, golden_png: Path, task: Dict[str, Any], rel_path: Path
+) -> Dict[str, Any]:
+    """Pixel-diff a card whose digest changed; writes a heatmap if it fails."""
+    try:
+        with Image.open(golden_png) as img:
+            golden = img.convert("RGB")
+    except OSError as e:
+        return {"status": "failed", "error": f"cannot read golden image: {e}"}
+    if golden.size != canvas.size:
+        return {
+            "status": "failed",
+            "error": f"golden is {golden.width}x{golden.height}, "
+            f"render is {canvas.width}x{canvas.height}",
+        }
+    largest, over, heat = diff_images(golden, canvas, task["tolerance"])
+    result: Dict[str, Any] = {"max_diff": largest, "pixels_over": over}
+    if over <= task["max_pixels"]:
+        result["status"] = "within_tolerance"
+        return result
+    heatmap = task["diff_dir"] / rel_path
+    heatmap.parent.mkdir(parents=True, exist_ok=True)
+    heat.save(heatmap, format="PNG", compress_level=1)
+    result["status"] = "failed"
+    result["heatmap"] = str(heatmap)
+    return result
+
+
+# ----------------------------------
+# CLI
+# ----------------------------------
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare rendered flashcards against golden renders."
+    )
+    parser.add_argument("--mapping", type=Path, default=Path("mapping.json"))
+    parser.add_argument("--images", type=Path, default=Path("data/illustrations"))
+    parser.add_argument(
+        "--font", type=Path, default=None, help="Optional path to a TrueType font file."
+    )
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=parse_size,
+        default=[(1500, 2500)],
+        metavar="WxH",
+        help="Card sizes to check (default: 1500x2500).",
+    )
+    parser.add_argument("--letter_color", default="#FF0000")
+    parser.add_argument("--word_color", default="#000000")
+    parser.add_argument("--crop_background", default="#FFFFFF")
+    parser.add_argument(
+        "--crop_tolerance", type=parse_tolerance, default=10, metavar="N|R,G,B"
+    )
+    parser.add_argument(
+        "--golden",
+        type=Path,
+        default=Path("data/golden"),
+        help="Directory of the golden renders (default: data/golden).",
+    )
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Store the current renders as the new golden set.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=0,
+        help="Largest per-channel difference a pixel may have (default: 0).",
+    )
+    parser.add_argument(
+        "--max_pixels",
+        type=int,
+        default=0,
+        help="Pixels that may exceed --tolerance before a card fails (default: 0).",
+    )
+    parser.add_argument(
+        "--diff_dir",
+        type=Path,
+        default=None,
+        help="Where heatmaps of failing cards go (default: GOLDEN/diffs).",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes (default: CPU count).",
+    )
+    parser.add_argument(
+        "--report", type=Path, default=None, help="Write the results as JSON."
+    )
+    args = parser.parse_args()
+    if not 0 <= args.tolerance <= 255:
+        parser.error("--tolerance must be between 0 and 255")
+    return args
+
+
+# ----------------------------------
+# Main
+# ----------------------------------
+
+
+def main() -> int:
+    args = parse_args()
+    pairs = load_mapping(args.mapping)
+    ttf_path = resolve_font_path(args.font)
+    index = IllustrationIndex(args.images)
+    golden_path = args.golden / GOLDEN_NAME
+    diff_dir = args.diff_dir if args.diff_dir is not None else args.golden / "diffs"
+
+    golden: Dict[str, Dict[str, Any]] = {}
+    try:
+        data = json.loads(golden_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data = None
+    if data is not None and data.get("version") == GOLDEN_VERSION:
+        golden = data["cards"]
+    elif data is None and not args.update:
+        print(f"No golden renders in {args.golden}; run with --update first.")
+        return 1
+    elif not args.update:
+        print(f"{golden_path} is from another version; run with --update.")
+        return 1
+
+    sizes = []
+    for w, h in args.sizes:
+        font_px = deck_font_sizes(pairs, Layout(w, h), ttf_path, cached=None)
+        sizes.append((f"{w}x{h}", (w, h), font_px))
+
+    tasks = []
+    missing: List[str] = []
+    for letter, word in pairs:
+        illustration = index.find(word)
+        if illustration is None:
+            missing.append(f"{letter} ({word})")
+            continue
+        names = [f"{size_name}/{letter} ({word})" for size_name, _, _ in sizes]
+        tasks.append(
+            {
+                "letter": letter,
+                "word": word,
+                "illustration": illustration,
+                "sizes": sizes,
+                "ttf_path": ttf_path,
+                "letters_color_rgb": hex_to_rgb(args.letter_color),
+                "word_color_rgb": hex_to_rgb(args.word_color),
+                "crop_bg_rgb": hex_to_rgb(args.crop_background),
+                "crop_tolerance": args.crop_tolerance,
+                "golden_dir": args.golden,
+                "golden": {name: golden[name] for name in names if name in golden},
+                "update": args.update,
+                "tolerance": args.tolerance,
+                "max_pixels": args.max_pixels,
+                "diff_dir": diff_dir,
+            }
+        )
+
+    jobs = max(1, min(args.jobs, len(tasks)))
+    if jobs == 1:
+        per_card = [check_card(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            per_card = list(executor.map(check_card, tasks))
+    results = [result for card in per_card for result in card]
+
+    size_names = {size_name for size_name, _, _ in sizes}
+    if args.update:
+        # The sizes of this run are replaced as a whole; other sizes are kept.
+        cards = {
+            name: entry
+            for name, entry in golden.items()
+            if name.split("/", 1)[0] not in size_names
+        }
+        kept = len(cards)
+        for r in results:
+            cards[r["card"]] = {
+                key: r[key] for key in ("sha256", "size", "font_px", "placement")
+            }
+        for name in golden.keys() - cards.keys():
+            # A card no longer in the deck.
+            (args.golden / f"{name}.png").unlink(missing_ok=True)
+        golden_path.parent.mkdir(parents=True, exist_ok=True)
+        golden_path.write_text(
+            json.dumps(
+                {"version": GOLDEN_VERSION, "cards": dict(sorted(cards.items()))},
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        print(f"Stored {len(results)} golden render(s) in {args.golden}.")
+        if kept:
+            print(f"Kept {kept} golden render(s) of other sizes.")
+        for name in missing:
+            print(f" - skipped {name}: missing illustration")
+        return 0
+
+    rendered = {r["card"] for r in results}
+    gone = sorted(
+        name
+        for name in golden
+        if name not in rendered and name.split("/", 1)[0] in size_names
+    )
+    counts: Dict[str, int] = {}
+    for r in results:
+        counts[r["status"]] = counts.get(r["status"], 0) + 1
+    print(", ".join(f"{n} {status.replace('_', ' ')}" for status, n in counts.items()))
+
+    for r in results:
+        if r["status"] == "within_tolerance":
+            print(
+                f" ~ {r['card']}: {r['pixels_over']} pixel(s) over tolerance, "
+                f"max difference {r['max_diff']}"
+            )
+        elif r["status"] == "new":
+            print(f" + {r['card']}: no golden render (run with --update)")
+        elif r["status"] == "failed":
+            detail = r.get("error") or (
+                f"{r['pixels_over']} pixel(s) differ by more than {args.tolerance} "
+                f"(max {r['max_diff']}); heatmap: {r['heatmap']}"
+            )
+            print(f" ✗ {r['card']}: {detail}")
+        if "moved" in r:
+            print(f"   placement changed from {r['moved']} to {r['placement']}")
+    for name in gone:
+        print(f" ✗ {name}: golden card was not rendered")
+
+    if args.report is not None:
+        report = {"results": results, "not_rendered": gone, "missing": missing}
+        args.report.parent.mkdir(parents=True, exist_ok=True)
+        args.report.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"Report written to {args.report}")
+
+    failed = counts.get("failed", 0) + counts.get("new", 0) + len(gone)
+    if failed:
+        return 1
+    print("\n✅ All cards match their golden renders.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
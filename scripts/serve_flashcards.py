@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Local HTTP render service for single flashcards.
+
+Keeps the font, the illustrations index and recent responses warm in memory, along
+with (LRU-bounded) cropped and fitted illustrations. The illustration rows of a PNG
+card are kept compressed per illustration and card size, so a new word or color only
+draws and compresses the two text bands; an SVG only needs the cached base64 image:
+
+    GET /card?word=Sophia&illustration=Sun&format=png&preset=3x5
+    POST /card   {"letter": "S", "word": "Sophia", "illustration": "Sun", "size": "600x1000"}
+    GET /health
+
+Parameters: word (required), letter (default: first letter of the word),
+illustration (default: the word; looked up like the batch build does), format
+(png or svg, default png), preset or size=WxH (default 1500x2500, at most
+--max_size), letter_color, word_color, letters_font_size, word_font_size. Invalid
+parameters get a 400 and cards that cannot be rendered a JSON error.
+
+Listens on --host/--port, or on a Unix socket with --unix_socket. At most
+--max_concurrent cards render at once; further requests wait up to --queue_timeout
+seconds and then get 503.
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from PIL import Image, UnidentifiedImageError
+
+from compose_flashcards_from_png import (
+    PRESETS,
+    IllustrationIndex,
+    Layout,
+    PngSegment,
+    PngStreamWriter,
+    card_fonts,
+    card_placement,
+    compose_svg,
+    draw_card,
+    fit_image,
+    hex_to_rgb,
+    image_area_size,
+    load_illustration,
+    parse_size,
+    render_canvas,
+    rgb_to_hex,
+    resolve_font_path,
+    text_bbox,
+)
+
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Longest word, letter or illustration name a request may pass.
+MAX_TEXT_LENGTH = 100
+
+# ----------------------------------
+# Helpers
+# ----------------------------------
+
+
+class LRUCache:
+    """A small thread-safe LRU mapping with a maximum number of entries."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def info(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class BadRequest(ValueError):
+    """A request parameter is missing or invalid (HTTP 400)."""
+
+
+class RenderService:
+    """Renders cards on request from warm, LRU-bounded caches."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.images_dir = args.images
+        self.ttf_path = resolve_font_path(args.font)
+        self.crop_cache_dir = args.cache_dir / "crops" if args.cache_dir else None
+        self.svg_font_family = args.svg_font_family
+        self.defaults = {
+            "letter_color": args.letter_color,
+            "word_color": args.word_color,
+        }
+        self.compress_level = args.png_compress_level
+        self.max_size = args.max_size
+        self.crops = LRUCache(args.crop_cache_size)
+        # Per (illustration, card size): the fitted image, its base64 PNG for SVGs
+        # and the compressed PNG rows it covers on the card.
+        self.fitted = LRUCache(args.crop_cache_size)
+        self.images_b64 = LRUCache(args.crop_cache_size)
+        self.segments = LRUCache(args.crop_cache_size)
+        self.responses = LRUCache(args.response_cache_size)
+        self.slots = threading.BoundedSemaphore(args.max_concurrent)
+        self.queue_timeout = args.queue_timeout
+        self._index_lock = threading.Lock()
+        self._index_mtime = 0
+        self._index = self._load_index()
+
+    def _load_index(self) -> IllustrationIndex:
+        self._index_mtime = self.images_dir.stat().st_mtime_ns
+        return IllustrationIndex(self.images_dir)
+
+    def find(self, name: str) -> Optional[Path]:
+        """Look an illustration up, rescanning the directory if it has changed."""
+        with self._index_lock:
+            if self.images_dir.stat().st_mtime_ns != self._index_mtime:
+                self._index = self._load_index()
+            return self._index.find(name)
+
+    @staticmethod
+    def crop_key(path: Path) -> Tuple[str, int, int]:
+        """Cache key of an illustration file; changes whenever the file does."""
+        stat = path.stat()
+        return (str(path), stat.st_size, stat.st_mtime_ns)
+
+    def illustration(self, path: Path) -> Tuple[Any, Image.Image]:
+        """Return (cache key, cropped illustration)."""
+        key = self.crop_key(path)
+        img = self.crops.get(key)
+        if img is None:
+            # remember=False: self.crops is the in-memory copy, and the module-level
+            # one is not safe to share between request threads.
+            img = load_illustration(
+                path, crop_cache_dir=self.crop_cache_dir, remember=False
+            )
+            self.crops.put(key, img)
+        return (key, img)
+
+    def fit(self, path: Path, layout: Layout) -> Tuple[Any, Image.Image]:
+        """Return (cache key, illustration fitted to the layout's image area)."""
+        crop_key, img = self.illustration(path)
+        key = (crop_key, layout.width, layout.height)
+        fitted = self.fitted.get(key)
+        if fitted is None:
+            fitted = fit_image(img, *image_area_size(layout))
+            self.fitted.put(key, fitted)
+        return (key, fitted)
+
+    def render_png(
+        self,
+        key: Any,
+        fitted: Image.Image,
+        layout: Layout,
+        placement: Tuple[int, int, int, int, int],
+        texts: Tuple[str, str],
+        fonts: Tuple[Any, Any],
+        colors: Tuple[Tuple[int, int, int], Tuple[int, int, int]],
+    ) -> bytes:
+        """
+        Encode the card as the text band above the illustration, the cached
+        illustration rows and the text band below. Falls back to a full render
+        when a (manually sized) text reaches into the illustration rows.
+        """
+        img_x, img_y, letters_y, _word_x, word_y = placement
+        fitted_end = img_y + fitted.height
+        letters_bottom = letters_y + text_bbox(texts[0], fonts[0])[3]
+        word_top = word_y + text_bbox(texts[1], fonts[1])[1]
+        buf = io.BytesIO()
+        size = (layout.width, layout.height)
+        writer = PngStreamWriter(buf, size, "RGB", self.compress_level)
+        if letters_bottom > img_y or word_top < fitted_end:
+            canvas, _ = render_canvas(*texts, fitted, layout, *fonts, *colors)
+            writer.write(canvas)
+            writer.close()
+            return buf.getvalue()
+
+        segment = self.segments.get(key)
+        if segment is None:
+            band = Image.new("RGB", (layout.width, fitted.height), (255, 255, 255))
+            band.paste(fitted, (img_x, 0), fitted)
+            segment = PngSegment(band, self.compress_level)
+            self.segments.put(key, segment)
+        for top, end in ((0, img_y), (img_y, fitted_end), (fitted_end, layout.height)):
+            if top == img_y:
+                writer.write_segment(segment)
+            elif end > top:
+                band = Image.new("RGB", (layout.width, end - top), (255, 255, 255))
+                draw_card(
+                    band, placement, layout, *texts, *fonts, *colors, None, 0, top=top
+                )
+                writer.write(band)
+        writer.close()
+        return buf.getvalue()
+
+    def image_b64(self, key: Any, fitted: Image.Image) -> str:
+        b64 = self.images_b64.get(key)
+        if b64 is None:
+            buf = io.BytesIO()
+            fitted.save(buf, format="PNG", compress_level=self.compress_level)
+            b64 = base64.b64encode(buf.getvalue()).decode("ascii")
+            self.images_b64.put(key, b64)
+        return b64
+
+    def parse(self, params: Dict[str, str]) -> Dict[str, Any]:
+        """Validate request parameters into render arguments."""
+        for key in ("word", "letter", "illustration"):
+            value = params.get(key, "")
+            if len(value) > MAX_TEXT_LENGTH:
+                raise BadRequest(f"{key} may be at most {MAX_TEXT_LENGTH} characters")
+            if any(unicodedata.category(ch) == "Cc" for ch in value):
+                raise BadRequest(f"{key} must not contain control characters")
+        word = params.get("word", "").strip()
+        if not word:
+            raise BadRequest("word is required")
+        letter = params.get("letter", word[0]).strip()
+        if len(letter) != 1:
+            raise BadRequest("letter must be a single character")
+        fmt = params.get("format", "png").lower()
+        if fmt not in CONTENT_TYPES:
+            raise BadRequest("format must be png or svg")
+        try:
+            if "preset" in params:
+                if params["preset"] not in PRESETS:
+                    raise BadRequest(f"unknown preset {params['preset']!r}")
+                size = PRESETS[params["preset"]]
+            else:
+                size = parse_size(params.get("size", "1500x2500"))
+            colors = tuple(
+                hex_to_rgb(params.get(key, default))
+                for key, default in self.defaults.items()
+            )
+            font_px = tuple(
+                int(params[key]) if params.get(key) else None
+                for key in ("letters_font_size", "word_font_size")
+            )
+        except (argparse.ArgumentTypeError, ValueError) as e:
+            raise BadRequest(str(e)) from None
+        if size[0] > self.max_size[0] or size[1] > self.max_size[1]:
+            raise BadRequest(
+                f"size may be at most {self.max_size[0]}x{self.max_size[1]}"
+            )
+        if any(px is not None and px <= 0 for px in font_px):
+            raise BadRequest("font sizes must be positive")
+        return {
+            "letter": letter.upper(),
+            "word": word,
+            "illustration": params.get("illustration", word),
+            "format": fmt,
+            "size": size,
+            "colors": colors,
+            "font_px": font_px,
+        }
+
+    def render(self, request: Dict[str, Any]) -> Optional[bytes]:
+        """Return the card bytes, or None if the illustration does not exist."""
+        path = self.find(request["illustration"])
+        if path is None:
+            return None
+        # Keyed on the illustration file as well, so a replaced file is re-rendered.
+        key = (json.dumps(request, sort_keys=True), self.crop_key(path))
+        cached = self.responses.get(key)
+        if cached is not None:
+            return cached
+        layout = Layout(*request["size"])
+        fit_key, fitted = self.fit(path, layout)
+        letter = request["letter"]
+        texts = (f"{letter} {letter.lower()}", request["word"])
+        letters_font, letters_px, word_font, word_px = card_fonts(
+            *texts, layout, self.ttf_path, *request["font_px"]
+        )
+        placement = card_placement(layout, fitted.size, *texts, letters_font, word_font)
+        colors = request["colors"]
+        if request["format"] == "png":
+            fonts = (letters_font, word_font)
+            data = self.render_png(
+                fit_key, fitted, layout, placement, texts, fonts, colors
+            )
+        else:
+            img_x, img_y, letters_y, _word_x, word_y = placement
+            data = compose_svg(
+                canvas_w=layout.width,
+                canvas_h=layout.height,
+                letters_text=texts[0],
+                letters_fill=rgb_to_hex(colors[0]),
+                word_text=texts[1],
+                word_fill=rgb_to_hex(colors[1]),
+                word_font_family=self.svg_font_family,
+                letters_font_family=self.svg_font_family,
+                img_b64_png=self.image_b64(fit_key, fitted),
+                img_x=img_x,
+                img_y=img_y,
+                img_w=fitted.width,
+                img_h=fitted.height,
+                letters_x=layout.letters_x,
+                letters_y=letters_y,
+                word_center_x=int(layout.width / 2),
+                word_y=word_y,
+                letters_font_px=letters_px,
+                word_font_px=word_px,
+            ).encode("utf-8")
+        self.responses.put(key, data)
+        return data
+
+
+class CardHandler(BaseHTTPRequestHandler):
+    server_version = "flashcards"
+    service: RenderService
+
+    def address_string(self) -> str:
+        # Unix socket clients have no address.
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str) -> None:
+        body = json.dumps({"error": message}).encode("utf-8")
+        self._send(status, body, "application/json")
+
+    def _card(self, params: Dict[str, str]) -> None:
+        try:
+            request = self.service.parse(params)
+        except BadRequest as e:
+            self._error(400, str(e))
+            return
+        if not self.service.slots.acquire(timeout=self.service.queue_timeout):
+            self._error(503, "too many concurrent requests")
+            return
+        try:
+            start = time.perf_counter()
+            data = self.service.render(request)
+            elapsed_ms = (time.perf_counter() - start) * 1e3
+        except ValueError as e:
+            # E.g. a font size that does not fit the card.
+            self._error(400, f"cannot render card: {e}")
+            return
+        except UnidentifiedImageError:
+            # E.g. a Git LFS pointer that was never fetched.
+            self._error(500, f"unreadable illustration for {request['illustration']!r}")
+            return
+        except OSError as e:
+            self._error(500, f"cannot render card: {e}")
+            return
+        finally:
+            self.service.slots.release()
+        if data is None:
+            self._error(404, f"no illustration for {request['illustration']!r}")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[request["format"]])
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Server-Timing", f"render;dur={elapsed_ms:.1f}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            body = {
+                "status": "ok",
+                "crops": self.service.crops.info(),
+                "fitted": self.service.fitted.info(),
+                "responses": self.service.responses.info(),
+            }
+            self._send(200, json.dumps(body).encode("utf-8"), "application/json")
+        elif url.path == "/card":
+            self._card(dict(parse_qsl(url.query)))
+        else:
+            self._error(404, "not found")
+
+    def do_POST(self) -> None:
+        if urlsplit(self.path).path != "/card":
+            self._error(404, "not found")
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._error(400, "body must be a JSON object")
+            return
+        if not isinstance(params, dict):
+            self._error(400, "body must be a JSON object")
+            return
+        self._card({key: str(value) for key, value in params.items()})
+
+
+class ThreadingUnixHTTPServer(
+    socketserver.ThreadingMixIn, socketserver.UnixStreamServer
+):
+    daemon_threads = True
+
+
+# ----------------------------------
+# CLI
+# ----------------------------------
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve single flashcards over HTTP.")
+    parser.add_argument("--images", type=Path, default=Path("data/illustrations"))
+    parser.add_argument(
+        "--font", type=Path, default=None, help="Optional path to a TrueType font file."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--unix_socket",
+        type=Path,
+        default=None,
+        help="Listen on this Unix socket instead of --host/--port.",
+    )
+    parser.add_argument("--letter_color", default="#FF0000")
+    parser.add_argument("--word_color", default="#000000")
+    parser.add_argument("--svg_font_family", default="Andika")
+    parser.add_argument(
+        "--max_size",
+        type=parse_size,
+        default=(6000, 10000),
+        metavar="WxH",
+        help="Largest card size a request may ask for (default: 6000x10000).",
+    )
+    parser.add_argument(
+        "--png_compress_level",
+        type=int,
+        choices=range(10),
+        default=1,
+        metavar="0-9",
+        help="zlib level for PNG responses (default: 1, fastest).",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=Path,
+        default=Path("data/.cache"),
+        help="Shared on-disk crop cache (default: data/.cache).",
+    )
+    parser.add_argument(
+        "--crop_cache_size",
+        type=int,
+        default=64,
+        help="Cropped and fitted illustrations kept in memory (default: 64).",
+    )
+    parser.add_argument(
+        "--response_cache_size",
+        type=int,
+        default=256,
+        help="Rendered cards kept in memory for repeated requests (default: 256).",
+    )
+    parser.add_argument(
+        "--max_concurrent",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Cards rendered at the same time (default: CPU count).",
+    )
+    parser.add_argument(
+        "--queue_timeout",
+        type=float,
+        default=10.0,
+        help="Seconds a request waits for a render slot before a 503 (default: 10).",
+    )
+    return parser.parse_args()
+
+
+# ----------------------------------
+# Main
+# ----------------------------------
+
+
+def main() -> int:
+    args = parse_args()
+    CardHandler.service = RenderService(args)
+
+    if args.unix_socket is not None:
+        if args.unix_socket.exists():
+            args.unix_socket.unlink()
+        server = ThreadingUnixHTTPServer(str(args.unix_socket), CardHandler)
+        where = str(args.unix_socket)
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), CardHandler)
+        where = f"http://{args.host}:{server.server_address[1]}"
+    print(f"Serving flashcards on {where} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket is not None and args.unix_socket.exists():
+            args.unix_socket.unlink()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
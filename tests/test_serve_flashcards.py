@@ -0,0 +1,81 @@
+"""Tests for the render server (scripts/serve_flashcards.py)."""
+
+import json
+import sys
+import threading
+import urllib.error
+import urllib.request
+import xml.etree.ElementTree as ET
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlencode
+
+import pytest
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import serve_flashcards  # noqa: E402
+
+SVG_NS = "{http://www.w3.org/2000/svg}"
+
+
+@pytest.fixture
+def server_url(tmp_path, monkeypatch):
+    images = tmp_path / "illustrations"
+    images.mkdir()
+    Image.new("RGB", (64, 64), (200, 40, 40)).save(images / "Tom.png")
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "serve_flashcards.py",
+            "--images",
+            str(images),
+            "--cache_dir",
+            str(tmp_path / "cache"),
+        ],
+    )
+    serve_flashcards.CardHandler.service = serve_flashcards.RenderService(
+        serve_flashcards.parse_args()
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), serve_flashcards.CardHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def get_card(url, **params):
+    query = urlencode({"illustration": "Tom", "size": "300x500", **params})
+    try:
+        with urllib.request.urlopen(f"{url}/card?{query}") as response:
+            return (response.status, response.read())
+    except urllib.error.HTTPError as e:
+        return (e.code, e.read())
+
+
+@pytest.mark.parametrize("word", ["Tom & Jerry", "<script>alert(1)</script>"])
+def test_svg_escapes_word(server_url, word):
+    status, body = get_card(server_url, word=word, format="svg")
+    assert status == 200
+    root = ET.fromstring(body)
+    texts = [text.text for text in root.iter(f"{SVG_NS}text")]
+    assert texts[-1] == word
+    assert not list(root.iter(f"{SVG_NS}script"))
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"word": "Tom\x00"},
+        {"word": "T" * (serve_flashcards.MAX_TEXT_LENGTH + 1)},
+        {"word": "Tom", "letters_font_size": "0"},
+        {"word": "Tom", "size": "100000x100000"},
+    ],
+)
+def test_rejects_invalid_parameters(server_url, params):
+    status, body = get_card(server_url, **params)
+    assert status == 400
+    assert "error" in json.loads(body)